@@ -0,0 +1,388 @@
+import asyncio
+import inspect
+import random
+import threading
+import time
+from collections import Counter
+import openai
+from rate_limiter import estimate_tokens
+from metric_timing import recorder as timing
+
+# ✅ 오류 분류: 재시도할 것(한도 / 서버 / 네트워크)과 바로 포기할 것(요청 / 인증 / 쿼터 소진)을 나눈다
+RETRYABLE_ERRORS = {"rate_limit", "server", "connection", "timeout"}
+
+def classify_error(e):
+    if isinstance(e, openai.APITimeoutError):
+        return "timeout"
+    if isinstance(e, openai.APIConnectionError):
+        return "connection"
+    status = getattr(e, "status_code", None)
+    if status == 429:
+        # 결제 한도 소진도 429 로 오지만 기다려도 풀리지 않는다
+        return "quota" if getattr(e, "code", None) == "insufficient_quota" else "rate_limit"
+    if status is not None and status >= 500:
+        return "server"
+    if status in (401, 403):
+        return "auth"
+    if status is not None:
+        return "client"
+    return "unknown"
+
+def retry_after(e):
+    # 서버가 알려준 대기 시간 (retry-after-ms / retry-after 헤더), 없으면 None
+    response = getattr(e, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        try:
+            return float(headers.get(name)) * scale
+        except (TypeError, ValueError):
+            continue
+    return None
+
+# ✅ 호출 계측: 전체 초 (seconds) 를 성공한 호출 / 대기(속도 조절) / 재시도(실패한 시도 + 백오프) 로 나눈다 (로그 컬럼 이름 그대로)
+CALL_FIELDS = ["api_latency", "queue_delay", "retry_delay"]
+# 스트리밍이면 첫 토큰까지 / 생성 속도도 잰다
+STREAM_FIELDS = ["ttft", "tokens_per_second", "completion_tokens"]
+
+class CallTrace:
+    def __init__(self):
+        self.call_start = time.perf_counter()
+        self.queued = 0.0
+        self.start = None
+        self.first = None
+        self.last = None
+        self.chunks = 0
+        self.parts = []
+        self.usage = None
+
+    def begin(self):
+        self.start = time.perf_counter()
+        self.first = self.last = None
+        self.chunks = 0
+        self.parts = []
+        self.usage = None
+
+    def chunk(self, chunk):
+        # 조각 하나를 기록하고 내용(없으면 None)을 돌려준다. include_usage 면 마지막 조각에 usage 가 온다
+        if getattr(chunk, "usage", None) is not None:
+            self.usage = chunk.usage
+        choices = getattr(chunk, "choices", None) or []
+        delta = getattr(choices[0].delta, "content", None) if choices else None
+        if delta:
+            now = time.perf_counter()
+            self.first = self.first or now
+            self.last = now
+            self.chunks += 1
+            self.parts.append(delta)
+        return delta
+
+    def text(self):
+        return "".join(self.parts)
+
+    def call_stats(self, end):
+        return {
+            "api_latency": round(end - self.start, 2),
+            "queue_delay": round(self.queued, 3),
+            "retry_delay": round(self.start - self.call_start - self.queued, 3),
+            "seconds": round(end - self.call_start, 2),
+        }
+
+    def stats(self, end):
+        tokens = getattr(self.usage, "completion_tokens", None) or self.chunks
+        rate = (tokens - 1) / (self.last - self.first) if self.first and self.last > self.first and tokens > 1 else None
+        return {
+            **self.call_stats(end),
+            "ttft": round(self.first - self.start, 3) if self.first else None,
+            "tokens_per_second": round(rate, 2) if rate else None,
+            "completion_tokens": tokens,
+        }
+
+def replay_stats(completion, seconds, timing, streaming=False):
+    # 재생한 응답은 기록 당시의 초와 구간 (기록에 없으면 None: 보관 로그로 채운 캐시 등)
+    stats = {field: (timing or {}).get(field) for field in CALL_FIELDS}
+    stats["seconds"] = seconds
+    if streaming:
+        usage = getattr(completion, "usage", None)
+        stats.update(ttft=None, tokens_per_second=None, completion_tokens=getattr(usage, "completion_tokens", None))
+    return stats
+
+async def parse_async(raw):
+    # with_raw_response 의 parse() 는 동기지만 (LegacyAPIResponse), AsyncAPIResponse 의 parse() 는 코루틴이다
+    parsed = raw.parse()
+    if inspect.isawaitable(parsed):
+        parsed = await parsed
+    return parsed
+
+class ApiCallError(Exception):
+    def __init__(self, kind, error, attempts):
+        super().__init__(f"{kind} ({attempts}회 시도): {error}")
+        self.kind = kind
+        self.error = error
+        self.attempts = attempts
+
+# ✅ 공용 API 클라이언트: rate_limiter 로 미리 속도를 맞추고, 응답의 x-ratelimit-* 헤더로 한도를 갱신하며,
+# 429 / 5xx / 네트워크 오류는 지터를 준 지수 백오프로 재시도한다. chat / achat 은 (응답, 대기 / 재시도까지 포함한 전체 초),
+# stats 를 주면 CALL_FIELDS (성공한 호출 / 대기 / 재시도 초) 를 채운다
+# cache (replay_cache.ReplayCache) 를 주면 기록된 응답은 호출 / 대기 없이 바로 돌려주고, 새 응답은 기록한다
+class RateLimitedClient:
+    def __init__(self, client=None, async_client=None, limiter=None, max_retries=5, base_delay=1.0, max_delay=60.0,
+                 cache=None):
+        # SDK 자체 재시도는 끄고 여기서만 재시도한다 (횟수 / 대기가 카운터에 다 잡히도록)
+        self.client = client.with_options(max_retries=0) if client is not None else None
+        self.async_client = async_client.with_options(max_retries=0) if async_client is not None else None
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.cache = cache
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.replayed = 0
+        self.errors = Counter()
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def backoff(self, attempt, error=None):
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        delay = random.uniform(delay / 2, delay)
+        return max(delay, retry_after(error) or 0.0)
+
+    def _estimate(self, kwargs):
+        return estimate_tokens(kwargs.get("messages") or [], kwargs.get("max_tokens") or 0)
+
+    def _replay(self, kwargs):
+        # 기록된 응답 (응답, 기록 당시 초, 기록 당시 구간) 또는 None. replay 모드에서 기록이 없으면 ApiCallError
+        if self.cache is None:
+            return None
+        hit = self.cache.lookup(kwargs)
+        if hit is not None:
+            with self._lock:
+                self.replayed += 1
+            return hit
+        if self.cache.mode == "replay":
+            with self._lock:
+                self.failures += 1
+                self.errors["replay_miss"] += 1
+            print("❌ 재생할 응답이 없습니다 (replay_miss)")
+            raise ApiCallError("replay_miss", "기록된 응답 없음", 0)
+        return None
+
+    def _succeeded(self, raw, estimated, elapsed, usage):
+        if self.limiter is not None:
+            self.limiter.observe(raw.headers)
+            self.limiter.settle(estimated, usage.total_tokens if usage else None)
+        with self._lock:
+            self.calls += 1
+            self.successes += 1
+            self.latency_total += elapsed
+            self.latency_max = max(self.latency_max, elapsed)
+
+    def _completed(self, raw, completion, estimated, trace, kwargs):
+        end = time.perf_counter()
+        self._succeeded(raw, estimated, end - trace.start, getattr(completion, "usage", None))
+        stats = trace.call_stats(end)
+        if self.cache is not None:
+            self.cache.store(kwargs, completion, stats["seconds"], {field: stats[field] for field in CALL_FIELDS})
+        return stats
+
+    def _stream_completed(self, raw, estimated, trace, kwargs):
+        end = time.perf_counter()
+        self._succeeded(raw, estimated, end - trace.start, trace.usage)
+        stats = trace.stats(end)
+        if self.cache is not None:
+            self.cache.put(kwargs, trace.text(), stats["seconds"], getattr(trace.usage, "total_tokens", None),
+                           {field: stats[field] for field in CALL_FIELDS})
+        return stats
+
+    def _acquire(self, estimated, trace):
+        if self.limiter is not None:
+            queued = time.perf_counter()
+            self.limiter.acquire(estimated)
+            trace.queued += time.perf_counter() - queued
+
+    async def _acquire_async(self, estimated, trace):
+        if self.limiter is not None:
+            queued = time.perf_counter()
+            await self.limiter.acquire_async(estimated)
+            trace.queued += time.perf_counter() - queued
+
+    def _interrupted(self, e, attempt):
+        # 조각을 이미 내보낸 뒤 끊긴 스트림은 이어 붙일 수 없으므로 재시도하지 않는다
+        kind = classify_error(e)
+        with self._lock:
+            self.calls += 1
+            self.failures += 1
+            self.errors[kind] += 1
+        print(f"❌ 스트림이 중간에 끊겼습니다 ({kind}): {e}")
+        return ApiCallError(kind, e, attempt)
+
+    def _failed(self, e, attempt, estimated):
+        # 다시 시도할 대기 초를 돌려주거나, 포기할 오류면 ApiCallError
+        kind = classify_error(e)
+        with self._lock:
+            self.calls += 1
+            self.errors[kind] += 1
+        if self.limiter is not None:
+            # 실패한 요청은 토큰을 쓰지 않았다
+            self.limiter.settle(estimated, 0)
+        if kind not in RETRYABLE_ERRORS or attempt >= self.max_retries:
+            with self._lock:
+                self.failures += 1
+            print(f"❌ API 호출 실패 ({kind}): {e}")
+            raise ApiCallError(kind, e, attempt) from e
+        delay = self.backoff(attempt, e)
+        with self._lock:
+            self.retries += 1
+        print(f"⏳ [{kind}] {delay:.1f}s 후 재시도... ({attempt}/{self.max_retries})")
+        if kind == "rate_limit" and self.limiter is not None:
+            # 한도 초과는 이 요청만이 아니라 모든 요청을 멈춘다: 다음 acquire 가 대신 기다린다
+            self.limiter.penalize(delay)
+            return 0.0
+        return delay
+
+    def chat(self, stats=None, **kwargs):
+        stats = {} if stats is None else stats
+        replayed = self._replay(kwargs)
+        if replayed is not None:
+            completion, seconds, recorded = replayed
+            stats.update(replay_stats(completion, seconds, recorded))
+            return completion, seconds
+        estimated = self._estimate(kwargs)
+        trace = CallTrace()
+        for attempt in range(1, self.max_retries + 1):
+            self._acquire(estimated, trace)
+            trace.begin()
+            try:
+                with timing.span("api.generate"):
+                    raw = self.client.chat.completions.with_raw_response.create(**kwargs)
+                    completion = raw.parse()
+            except Exception as e:
+                time.sleep(self._failed(e, attempt, estimated))
+                continue
+            stats.update(self._completed(raw, completion, estimated, trace, kwargs))
+            return completion, stats["seconds"]
+
+    async def achat(self, stats=None, **kwargs):
+        stats = {} if stats is None else stats
+        replayed = self._replay(kwargs)
+        if replayed is not None:
+            completion, seconds, recorded = replayed
+            stats.update(replay_stats(completion, seconds, recorded))
+            return completion, seconds
+        estimated = self._estimate(kwargs)
+        trace = CallTrace()
+        for attempt in range(1, self.max_retries + 1):
+            await self._acquire_async(estimated, trace)
+            trace.begin()
+            try:
+                with timing.span("api.generate"):
+                    raw = await self.async_client.chat.completions.with_raw_response.create(**kwargs)
+                    completion = await parse_async(raw)
+            except Exception as e:
+                await asyncio.sleep(self._failed(e, attempt, estimated))
+                continue
+            stats.update(self._completed(raw, completion, estimated, trace, kwargs))
+            return completion, stats["seconds"]
+
+    def stream(self, stats=None, **kwargs):
+        # 응답 조각을 차례로 내보내는 스트리밍 호출. 끝나면 stats 에 CALL_FIELDS / STREAM_FIELDS 와 seconds 를 채운다
+        # 첫 조각 전 오류는 chat 과 같이 재시도하고, 조각을 내보낸 뒤 끊기면 ApiCallError
+        stats = {} if stats is None else stats
+        replayed = self._replay(kwargs)
+        if replayed is not None:
+            completion, seconds, recorded = replayed
+            stats.update(replay_stats(completion, seconds, recorded, streaming=True))
+            yield completion.choices[0].message.content
+            return
+        estimated = self._estimate(kwargs)
+        request = {**kwargs, "stream": True, "stream_options": {"include_usage": True}}
+        trace = CallTrace()
+        for attempt in range(1, self.max_retries + 1):
+            self._acquire(estimated, trace)
+            trace.begin()
+            try:
+                with timing.span("api.generate"):
+                    raw = self.client.chat.completions.with_raw_response.create(**request)
+                    for chunk in raw.parse():
+                        delta = trace.chunk(chunk)
+                        if delta:
+                            yield delta
+            except Exception as e:
+                if trace.first is not None:
+                    raise self._interrupted(e, attempt) from e
+                time.sleep(self._failed(e, attempt, estimated))
+                continue
+            stats.update(self._stream_completed(raw, estimated, trace, kwargs))
+            return
+
+    async def astream(self, stats=None, **kwargs):
+        stats = {} if stats is None else stats
+        replayed = self._replay(kwargs)
+        if replayed is not None:
+            completion, seconds, recorded = replayed
+            stats.update(replay_stats(completion, seconds, recorded, streaming=True))
+            yield completion.choices[0].message.content
+            return
+        estimated = self._estimate(kwargs)
+        request = {**kwargs, "stream": True, "stream_options": {"include_usage": True}}
+        trace = CallTrace()
+        for attempt in range(1, self.max_retries + 1):
+            await self._acquire_async(estimated, trace)
+            trace.begin()
+            try:
+                with timing.span("api.generate"):
+                    raw = await self.async_client.chat.completions.with_raw_response.create(**request)
+                    async for chunk in await parse_async(raw):
+                        delta = trace.chunk(chunk)
+                        if delta:
+                            yield delta
+            except Exception as e:
+                if trace.first is not None:
+                    raise self._interrupted(e, attempt) from e
+                await asyncio.sleep(self._failed(e, attempt, estimated))
+                continue
+            stats.update(self._stream_completed(raw, estimated, trace, kwargs))
+            return
+
+    def chat_stream(self, **kwargs):
+        # 스트리밍으로 끝까지 받아 (전체 응답, 계측) 을 돌려준다
+        stats = {}
+        text = "".join(self.stream(stats, **kwargs))
+        return text, stats
+
+    async def achat_stream(self, **kwargs):
+        stats = {}
+        parts = [delta async for delta in self.astream(stats, **kwargs)]
+        return "".join(parts), stats
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                "calls": self.calls,
+                "successes": self.successes,
+                "failures": self.failures,
+                "retries": self.retries,
+                "replayed": self.replayed,
+                "errors": dict(self.errors),
+                "latency_avg": round(self.latency_total / self.successes, 3) if self.successes else 0.0,
+                "latency_max": round(self.latency_max, 3),
+            }
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        if self.limiter is not None:
+            stats.update(waited=round(self.limiter.waited, 2), rpm=self.limiter.rpm, tpm=self.limiter.tpm)
+        return stats
+
+    def print_summary(self):
+        stats = self.stats()
+        print(f"📡 API 호출 {stats['calls']}회: 성공 {stats['successes']} / 재시도 {stats['retries']} / 실패 {stats['failures']}"
+              f" ⏱ 평균 {stats['latency_avg']}s, 최대 {stats['latency_max']}s")
+        if stats["replayed"]:
+            print(f"   📼 재생 {stats['replayed']}회 ({stats['cache']})")
+        if stats["errors"]:
+            print(f"   오류 분류: {stats['errors']}")
+        if self.limiter is not None:
+            print(f"   속도 조절 대기 {stats['waited']}s (RPM {stats['rpm']}, TPM {stats['tpm']})")
@@ -0,0 +1,44 @@
+import asyncio
+
+# ✅ asyncio 실험 엔진: 라운드 안에서는 화자들을 동시에 생성하고, 라운드 사이에는 배리어를 둔다
+# generate(speaker, question, round_num, snapshot) → (응답, 걸린 초, *추가) 코루틴 (추가 값은 콜백에 그대로 넘긴다)
+# snapshot 은 라운드 시작 시점의 full_responses 복사본이라 같은 라운드의 다른 화자 응답은 보지 않는다
+# on_response(round_num, speaker, question, message_index, response, duration) 은 라운드가 끝난 뒤
+# 화자 순서 / 메시지 순서대로 호출되므로 로그 순서와 이전 메시지 문맥은 순차 실행과 같다
+# on_generated(같은 인자) 는 생성 직후 바로 호출된다 (저널 기록용)
+# skip(round_num, speaker) → 이어서 실행할 때 건너뛸 메시지 수 (실패로 끝낸 화자는 전부)
+# resumed(round_num, speaker) → 그중 이미 생성돼 full_responses 끝에 들어 있는 메시지 수 (없으면 skip 과 같다고 본다)
+# on_break(round_num, speaker, message_index) 는 [ERROR] 로 화자의 라운드를 끝낼 때 호출된다
+async def run_rounds(speakers, questions, messages_per_speaker, generate, on_response, full_responses, rounds=None,
+                     on_generated=None, skip=None, resumed=None, on_break=None):
+    round_numbers = rounds or range(1, len(questions) + 1)
+    for round_num in round_numbers:
+        question = questions[round_num - 1]
+        skips = {speaker: skip(round_num, speaker) if skip else 0 for speaker in speakers}
+        if all(count >= messages_per_speaker for count in skips.values()):
+            continue
+        print(f"\n🌀 ROUND {round_num}: {question}")
+        # 이번 라운드에 이미 생성된 메시지는 스냅샷에서 뺀다 (라운드 시작 시점 기준 유지)
+        done = {speaker: resumed(round_num, speaker) for speaker in speakers} if resumed else skips
+        snapshot = {name: list(messages[:len(messages) - done.get(name, 0)]) for name, messages in full_responses.items()}
+
+        async def speaker_turns(speaker):
+            turns = []
+            for i in range(skips[speaker], messages_per_speaker):
+                response, duration, *extra = await generate(speaker, question, round_num, snapshot)
+                print(f"🗣 {speaker}: {response[:60]}... ⏱ {duration}s")
+                if "[ERROR]" in response:
+                    print(f"⚠️ {speaker} 응답 실패, 다음으로")
+                    if on_break is not None:
+                        on_break(round_num, speaker, i)
+                    break
+                if on_generated is not None:
+                    on_generated(round_num, speaker, question, i, response, duration, *extra)
+                turns.append((i, response, duration, extra))
+            return turns
+
+        results = await asyncio.gather(*(speaker_turns(speaker) for speaker in speakers))
+        for speaker, turns in zip(speakers, results):
+            for i, response, duration, extra in turns:
+                on_response(round_num, speaker, question, i, response, duration, *extra)
+                full_responses[speaker].append(response)
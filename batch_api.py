@@ -0,0 +1,85 @@
+import json
+import time
+
+# ✅ 배치 API: 서로 의존하지 않는 요청들을 JSONL 배치 파일 하나로 제출하고, 끝날 때까지 폴링해 결과를 읽는다
+# 파일 형식은 OpenAI Batch API 와 같다: {"custom_id", "method": "POST", "url": "/v1/chat/completions", "body": {...}}
+BATCH_ENDPOINT = "/v1/chat/completions"
+BATCH_DONE = ("completed", "failed", "expired", "cancelled")
+
+def batch_line(custom_id, body):
+    return {"custom_id": custom_id, "method": "POST", "url": BATCH_ENDPOINT, "body": body}
+
+def write_batch_file(path, requests):
+    # requests: [(custom_id, chat.completions 인자)]
+    with open(path, "w", encoding="utf-8") as f:
+        for custom_id, body in requests:
+            f.write(json.dumps(batch_line(custom_id, body), ensure_ascii=False) + "\n")
+    return path
+
+def submit_batch(client, path, completion_window="24h", metadata=None):
+    with open(path, "rb") as f:
+        uploaded = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=uploaded.id, endpoint=BATCH_ENDPOINT, completion_window=completion_window, metadata=metadata
+    )
+    print(f"📦 배치 제출: {batch.id} (입력 파일 {uploaded.id})")
+    return batch
+
+def wait_for_batch(client, batch_id, poll_interval=30.0, timeout=None):
+    start = time.time()
+    last_status = None
+    while True:
+        batch = client.batches.retrieve(batch_id)
+        counts = getattr(batch, "request_counts", None)
+        status = (batch.status, getattr(counts, "completed", None), getattr(counts, "failed", None))
+        if status != last_status:
+            done = f" (완료 {counts.completed}/{counts.total}, 실패 {counts.failed})" if counts else ""
+            print(f"⏳ 배치 {batch_id}: {batch.status}{done}")
+            last_status = status
+        if batch.status in BATCH_DONE:
+            return batch
+        if timeout is not None and time.time() - start > timeout:
+            raise TimeoutError(f"배치 {batch_id} 가 {timeout}s 안에 끝나지 않았습니다 (상태: {batch.status})")
+        time.sleep(poll_interval)
+
+def parse_batch_output(text):
+    # custom_id → {"content", "total_tokens", "error"} (실패한 요청은 content=None)
+    results = {}
+    for line in text.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        response = record.get("response") or {}
+        body = response.get("body") or {}
+        error = record.get("error")
+        if error is None and response.get("status_code", 200) >= 400:
+            error = body.get("error") or {"message": f"status {response.get('status_code')}"}
+        if error is not None:
+            results[record["custom_id"]] = {"content": None, "total_tokens": None, "error": error}
+            continue
+        usage = body.get("usage") or {}
+        results[record["custom_id"]] = {
+            "content": body["choices"][0]["message"]["content"],
+            "total_tokens": usage.get("total_tokens"),
+            "error": None,
+        }
+    return results
+
+def read_batch_results(client, batch):
+    results = {}
+    for file_id in (getattr(batch, "error_file_id", None), getattr(batch, "output_file_id", None)):
+        if file_id:
+            results.update(parse_batch_output(client.files.content(file_id).text))
+    return results
+
+def run_batch(client, requests, path, batch_id=None, on_submitted=None, poll_interval=30.0, timeout=None):
+    # batch_id 가 있으면 (이어서 실행) 다시 제출하지 않고 그 배치의 결과를 기다린다
+    if batch_id is None:
+        write_batch_file(path, requests)
+        batch_id = submit_batch(client, path, metadata={"source": "lirith"}).id
+        if on_submitted is not None:
+            on_submitted(batch_id)
+    batch = wait_for_batch(client, batch_id, poll_interval, timeout)
+    if batch.status != "completed":
+        print(f"⚠️ 배치 {batch_id} 상태: {batch.status}, 받은 결과만 기록합니다")
+    return read_batch_results(client, batch)
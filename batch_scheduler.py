@@ -0,0 +1,79 @@
+import os
+
+# ✅ 길이 버킷 동적 배치: 대기 중인 텍스트를 토큰 길이로 정렬해 버킷으로 나누고,
+# 패딩 포함 토큰 수 예산 안에서 배치를 묶어 실행한 뒤 결과를 원래 순서로 돌려준다
+TOKEN_BUDGET = int(os.getenv("LIRITH_TOKEN_BUDGET", "8192"))  # 배치 하나의 (가장 긴 길이 × 개수) 상한
+BUCKET_BOUNDS = [16, 32, 64, 128, 256, 512]  # 마지막 경계를 넘는 입력은 한 버킷에 모은다
+
+def token_lengths(texts, tokenizer=None):
+    # 토크나이저가 없으면 공백 단어 수 + 특수 토큰 2개로 근사
+    if tokenizer is None:
+        return [len(t.split()) + 2 for t in texts]
+    return [len(ids) for ids in tokenizer(list(texts), verbose=False)["input_ids"]]
+
+def isolated_batch(fn, inputs, on_error=None):
+    # 한 번의 패딩 배치로 호출하고, 실패하면 반으로 나눠 실패한 입력만 격리 (on_error(예외) 또는 None)
+    if not inputs:
+        return []
+    try:
+        return list(fn(inputs))
+    except Exception as e:
+        if len(inputs) == 1:
+            return [on_error(e) if on_error else None]
+        mid = len(inputs) // 2
+        return isolated_batch(fn, inputs[:mid], on_error) + isolated_batch(fn, inputs[mid:], on_error)
+
+def _bucket(length):
+    for i, bound in enumerate(BUCKET_BOUNDS):
+        if length <= bound:
+            return i
+    return len(BUCKET_BOUNDS)
+
+class LengthBucketScheduler:
+    def __init__(self, token_budget=TOKEN_BUDGET, max_batch_size=32):
+        self.token_budget = token_budget
+        self.max_batch_size = max_batch_size
+        self.batches_run = 0
+        self.padded_tokens = 0
+        self.real_tokens = 0
+
+    def plan(self, lengths, max_batch_size=None):
+        # 입력 인덱스 배치 목록. 같은 버킷 안에서 길이 순으로 묶으므로 배치 안의 길이 차이가 작다
+        max_batch_size = max_batch_size or self.max_batch_size
+        order = sorted(range(len(lengths)), key=lambda i: (_bucket(lengths[i]), lengths[i]))
+        batches, current, current_bucket = [], [], None
+        for i in order:
+            bucket = _bucket(lengths[i])
+            # 정렬돼 있으므로 지금 넣을 입력이 배치에서 가장 길다 (= 패딩 길이)
+            if current and (
+                bucket != current_bucket
+                or len(current) >= max_batch_size
+                or lengths[i] * (len(current) + 1) > self.token_budget
+            ):
+                batches.append(current)
+                current = []
+            current.append(i)
+            current_bucket = bucket
+        if current:
+            batches.append(current)
+        return batches
+
+    def map(self, fn, texts, lengths=None, max_batch_size=None):
+        # fn(배치 텍스트 리스트) → 같은 길이의 결과 리스트
+        if not texts:
+            return []
+        lengths = lengths or token_lengths(texts)
+        results = [None] * len(texts)
+        for batch in self.plan(lengths, max_batch_size):
+            outputs = fn([texts[i] for i in batch])
+            for i, output in zip(batch, outputs):
+                results[i] = output
+            self.batches_run += 1
+            self.padded_tokens += max(lengths[i] for i in batch) * len(batch)
+            self.real_tokens += sum(lengths[i] for i in batch)
+        return results
+
+    def stats(self):
+        waste = 1.0 - self.real_tokens / self.padded_tokens if self.padded_tokens else 0.0
+        return {"batches": self.batches_run, "padded_tokens": self.padded_tokens,
+                "real_tokens": self.real_tokens, "padding_waste": round(waste, 4)}
@@ -0,0 +1,182 @@
+import argparse
+import csv
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+import numpy as np
+
+# ✅ 지표 벤치마크: 저장된 두 실험 로그를 고정 코퍼스로 사용
+DEFAULT_CORPORA = ["experiment_log_20250519_224406.csv", "experiment_zeroDNA_log_20250520_074013.csv"]
+DEFAULT_OUTPUT = "benchmark_results.json"
+
+csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+
+def load_corpus(paths, limit=None):
+    # (message, previous_message, question) — 이전 메시지는 러너처럼 같은 화자의 직전 응답
+    items = []
+    for path in paths:
+        last_by_speaker = {}
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                items.append((row["message"], last_by_speaker.get(row["speaker"], ""), row["question"]))
+                last_by_speaker[row["speaker"]] = row["message"]
+    return items[:limit] if limit else items
+
+def peak_rss_mb():
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+    except ImportError:
+        try:
+            import psutil
+            return round(psutil.Process().memory_info().peak_wset / (1024 * 1024), 1)
+        except Exception:
+            return None
+
+def _summary(latencies, total_seconds):
+    arr = np.asarray(latencies) * 1000.0
+    return {
+        "count": len(latencies),
+        "throughput_per_s": round(len(latencies) / total_seconds, 3) if total_seconds > 0 else None,
+        "p50_ms": round(float(np.percentile(arr, 50)), 3),
+        "p95_ms": round(float(np.percentile(arr, 95)), 3),
+        "mean_ms": round(float(arr.mean()), 3),
+    }
+
+def _reset_caches(metrics):
+    # 캐시가 측정을 가리지 않도록 매 측정마다 비운다
+    from grammar_pool import GrammarService
+    from nli_service import NLIService
+    metrics.configure_embedding_cache(None)
+    metrics.configure_grammar_service(GrammarService(cache_size=0))
+    metrics.configure_nli_service(NLIService(model_name=metrics.nli_service.model_name, cache_size=0))
+
+def time_model_loads(metrics, backends):
+    loads = {}
+    for name in backends:
+        metrics.unload_models(name)
+        start = time.perf_counter()
+        metrics.registry.get(name)
+        loads[name] = round(time.perf_counter() - start, 3)
+        print(f"📦 {name} 로드: {loads[name]}s")
+    return loads
+
+def bench_metric(metrics, items, metric_names):
+    _reset_caches(metrics)
+    latencies = []
+    start = time.perf_counter()
+    for message, previous, question in items:
+        t = time.perf_counter()
+        metrics.compute_lirith_resonance_profile(message, previous, question, metrics=metric_names)
+        latencies.append(time.perf_counter() - t)
+    return _summary(latencies, time.perf_counter() - start)
+
+def bench_batch(metrics, items, batch_size):
+    _reset_caches(metrics)
+    start = time.perf_counter()
+    latencies = []
+    for i in range(0, len(items), batch_size):
+        chunk = items[i:i + batch_size]
+        t = time.perf_counter()
+        metrics.compute_lirith_resonance_profile_batch(chunk, batch_size=batch_size)
+        # 배치 안의 메시지당 지연으로 환산
+        latencies.extend([(time.perf_counter() - t) / len(chunk)] * len(chunk))
+    return _summary(latencies, time.perf_counter() - start)
+
+def run_benchmark(corpora=DEFAULT_CORPORA, limit=None, metric_names=None, batch_size=32):
+    start_import = time.perf_counter()
+    import metrics_vFinal as metrics
+    import_seconds = round(time.perf_counter() - start_import, 3)
+
+    items = load_corpus(corpora, limit)
+    names = metric_names or list(metrics.METRIC_SPECS)
+    print(f"🧪 코퍼스 {len(items)}개 메시지, 지표 {len(names)}개")
+
+    results = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(), "cpu_count": os.cpu_count(),
+                        "backends": {name: metrics.registry.variant(name) or "torch" for name in metrics.registry.names()}},
+        "corpus": {"files": list(corpora), "messages": len(items)},
+        "import_seconds": import_seconds,
+        "model_load_seconds": time_model_loads(metrics, metrics.required_backends(names)),
+        "metrics": {},
+    }
+    for name in names:
+        results["metrics"][name] = bench_metric(metrics, items, [name])
+        s = results["metrics"][name]
+        print(f"⏱ {name}: p50 {s['p50_ms']}ms / p95 {s['p95_ms']}ms / {s['throughput_per_s']} msg/s")
+    if metric_names is None:
+        results["profile"] = bench_metric(metrics, items, None)
+        results["profile_batch"] = bench_batch(metrics, items, batch_size)
+        for key in ("profile", "profile_batch"):
+            s = results[key]
+            print(f"⏱ {key}: p50 {s['p50_ms']}ms / p95 {s['p95_ms']}ms / {s['throughput_per_s']} msg/s")
+    results["batch_scheduler"] = metrics.batch_scheduler.stats()
+    results["peak_rss_mb"] = peak_rss_mb()
+    print(f"💾 peak RSS: {results['peak_rss_mb']} MB")
+    return results
+
+# ✅ 기준 결과와 비교: 지연이 tolerance 이상 늘거나 처리량이 그만큼 줄면 회귀로 표시
+def compare_to_baseline(results, baseline, tolerance=0.2):
+    regressions = []
+
+    def check(label, current, base):
+        if not current or not base:
+            return
+        for key in ("p50_ms", "p95_ms"):
+            if base.get(key) and current[key] > base[key] * (1 + tolerance):
+                regressions.append(f"{label}.{key}: {base[key]} → {current[key]}")
+        if base.get("throughput_per_s") and current["throughput_per_s"] < base["throughput_per_s"] / (1 + tolerance):
+            regressions.append(f"{label}.throughput_per_s: {base['throughput_per_s']} → {current['throughput_per_s']}")
+
+    for name, current in results.get("metrics", {}).items():
+        check(name, current, baseline.get("metrics", {}).get(name))
+    for key in ("profile", "profile_batch"):
+        check(key, results.get(key), baseline.get(key))
+    # import 시간은 작은 값이라 허용 비율에 더해 0.5초 여유를 둔다
+    base_import, import_seconds = baseline.get("import_seconds"), results.get("import_seconds")
+    if base_import is not None and import_seconds is not None and import_seconds > base_import * (1 + tolerance) + 0.5:
+        regressions.append(f"import_seconds: {base_import} → {import_seconds}")
+    base_rss, rss = baseline.get("peak_rss_mb"), results.get("peak_rss_mb")
+    if base_rss and rss and rss > base_rss * (1 + tolerance):
+        regressions.append(f"peak_rss_mb: {base_rss} → {rss}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="metrics_vFinal 지표별 비용 벤치마크")
+    parser.add_argument("--corpus", nargs="*", default=DEFAULT_CORPORA)
+    parser.add_argument("--limit", type=int, default=None, help="사용할 메시지 수 상한")
+    parser.add_argument("--metrics", default=None, help="쉼표로 구분한 지표 이름 (기본: 전체 + 프로파일)")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=None, help="비교할 기준 결과 JSON")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="회귀 판정 허용 비율 (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+
+    metric_names = [m.strip() for m in args.metrics.split(",") if m.strip()] if args.metrics else None
+    results = run_benchmark(args.corpus, args.limit, metric_names, args.batch_size)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(results, baseline, args.tolerance)
+        results["baseline"] = {"path": args.baseline, "tolerance": args.tolerance, "regressions": regressions}
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"✅ 결과 저장: {args.output}")
+
+    if regressions:
+        print("❌ 성능 회귀:")
+        for r in regressions:
+            print(f"  - {r}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+import numpy as np
+import metrics_vFinal as metrics
+
+def _normalize(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+# ✅ 교차 에코 행렬: 화자별 마지막 메시지의 정규화 임베딩을 한 행씩 보관
+# 턴마다 현재 메시지를 한 번만 인코딩하고, 다른 화자 전체와의 유사도는 행렬곱 한 번으로 계산한다
+class CrossEchoMatrix:
+    def __init__(self, speakers=(), encode_fn=None):
+        self.speakers = []
+        self._index = {}
+        self._vectors = None
+        self._present = np.zeros(0, dtype=bool)
+        self._encode_fn = encode_fn or metrics.encode_texts
+        for name in speakers:
+            self.add_speaker(name)
+
+    @classmethod
+    def from_responses(cls, full_responses_dict, encode_fn=None):
+        echo = cls(list(full_responses_dict), encode_fn)
+        latest = {name: msgs[-1] for name, msgs in full_responses_dict.items() if msgs and msgs[-1]}
+        if latest:
+            vectors = _normalize(echo._encode_fn(list(latest.values())))
+            for name, vector in zip(latest, vectors):
+                echo._set(name, vector)
+        return echo
+
+    def add_speaker(self, name):
+        if name in self._index:
+            return
+        self._index[name] = len(self.speakers)
+        self.speakers.append(name)
+        self._present = np.append(self._present, False)
+        if self._vectors is not None:
+            self._vectors = np.vstack([self._vectors, np.zeros((1, self._vectors.shape[1]), dtype=np.float32)])
+
+    def _set(self, name, vector):
+        self.add_speaker(name)
+        if self._vectors is None:
+            self._vectors = np.zeros((len(self.speakers), len(vector)), dtype=np.float32)
+        self._vectors[self._index[name]] = vector
+        self._present[self._index[name]] = True
+
+    def embed(self, message):
+        return _normalize(self._encode_fn([message]))[0]
+
+    def scores(self, speaker, message, vector=None):
+        # speaker 를 제외한 모든 화자의 마지막 메시지와 message 의 코사인 유사도
+        others = [name for name in self.speakers if name != speaker]
+        result = {f"cross_echo_{name}": 0.0 for name in others}
+        if not message or self._vectors is None or not self._present.any():
+            return result
+        if vector is None:
+            vector = self.embed(message)
+        sims = self._vectors @ vector
+        for name in others:
+            i = self._index[name]
+            if self._present[i]:
+                result[f"cross_echo_{name}"] = float(sims[i])
+        return result
+
+    def update(self, speaker, message, vector=None):
+        if not message:
+            return
+        self._set(speaker, vector if vector is not None else self.embed(message))
+
+    def observe(self, speaker, message, vector=None):
+        # 점수를 먼저 계산하고 (이전 상태 기준) 그 다음 화자의 마지막 메시지를 갱신
+        # vector: 이미 계산된 메시지 임베딩이 있으면 넘긴다 (정규화 전이어도 된다)
+        if vector is not None:
+            vector = _normalize(vector)
+        elif message:
+            vector = self.embed(message)
+        result = self.scores(speaker, message, vector)
+        self.update(speaker, message, vector)
+        return result
+
+    def matrix(self):
+        # 화자 × 화자 유사도 행렬 (메시지가 없는 화자의 행/열은 0)
+        n = len(self.speakers)
+        if self._vectors is None:
+            return np.zeros((n, n), dtype=np.float32)
+        masked = self._vectors * self._present[:, None]
+        return masked @ masked.T
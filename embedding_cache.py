@@ -0,0 +1,228 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_CACHE_DIR = os.getenv("LIRITH_EMBEDDING_CACHE", "./lirith_embedding_cache")
+
+# ✅ 프로세스 간 추가 쓰기 잠금
+@contextmanager
+def _locked(path):
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+# ✅ 콘텐츠 주소 임베딩 캐시: sha256(모델 이름 + 텍스트) → float32 벡터
+# 메모리 LRU 층 + 디스크의 memmap float32 저장소 (vectors.f32 에 행 단위로 추가, index.tsv 에 키 → 행)
+# 쓰기 순서는 벡터 → 색인. 쓰다가 끊기면 색인에 없는 꼬리 (반쪽 행 포함) 가 남으므로 다음 추가 전에 잘라낸다
+class EmbeddingCache:
+    def __init__(self, model_name, cache_dir=DEFAULT_CACHE_DIR, max_memory_items=50000, persist=True):
+        self.model_name = model_name
+        self.cache_dir = cache_dir
+        self.max_memory_items = max_memory_items
+        self.persist = persist
+        self.dir = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]", "_", model_name))
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()
+        self._index = {}
+        self._index_offset = 0
+        self._indexed_rows = 0
+        self._dim = None
+        self._mmap = None
+        self._mmap_rows = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @property
+    def _vectors_path(self):
+        return os.path.join(self.dir, "vectors.f32")
+
+    @property
+    def _index_path(self):
+        return os.path.join(self.dir, "index.tsv")
+
+    @property
+    def _meta_path(self):
+        return os.path.join(self.dir, "meta.json")
+
+    def key(self, text):
+        return hashlib.sha256(f"{self.model_name}\n{text}".encode("utf-8")).hexdigest()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory_items": len(self._lru),
+            "disk_items": len(self._index),
+        }
+
+    # --- 메모리 LRU ---
+    def _remember(self, key, vector):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_memory_items:
+            self._lru.popitem(last=False)
+
+    # --- 디스크 저장소 ---
+    def _load_meta(self):
+        if self._dim is None and os.path.exists(self._meta_path):
+            with open(self._meta_path, "r", encoding="utf-8") as f:
+                self._dim = json.load(f)["dim"]
+
+    def _refresh_index(self):
+        # 다른 프로세스가 덧붙인 항목까지 읽어 들인다
+        if not os.path.exists(self._index_path):
+            return
+        with open(self._index_path, "r", encoding="utf-8") as f:
+            f.seek(self._index_offset)
+            while True:
+                line = f.readline()
+                if not line.endswith("\n"):
+                    break  # 아직 쓰는 중인 마지막 줄은 다음에 다시 읽는다
+                key, row = line.rstrip("\n").split("\t")
+                self._index[key] = int(row)
+                self._indexed_rows = max(self._indexed_rows, int(row) + 1)
+                self._index_offset = f.tell()
+        self._check_store()
+
+    def _stored_rows(self):
+        if self._dim is None or not os.path.exists(self._vectors_path):
+            return 0
+        return os.path.getsize(self._vectors_path) // (self._dim * 4)
+
+    def _check_store(self):
+        # 벡터 파일이 색인보다 짧으면 (잘리거나 지워진 저장소) 없는 행을 가리키는 항목을 버린다
+        if not self._index or self._dim is None:
+            return
+        rows = self._stored_rows()
+        missing = [key for key, row in self._index.items() if row >= rows]
+        if missing:
+            print(f"⚠️ 임베딩 캐시 {self.dir}: 벡터 파일에 없는 색인 {len(missing)}개를 무시합니다")
+            for key in missing:
+                del self._index[key]
+
+    def _read_row(self, row):
+        if self._mmap is None or row >= self._mmap_rows:
+            rows = self._stored_rows()
+            self._mmap = np.memmap(self._vectors_path, dtype=np.float32, mode="r", shape=(rows, self._dim))
+            self._mmap_rows = rows
+        return np.array(self._mmap[row])
+
+    def _truncate_tail(self):
+        # 잠금 안에서만 호출: 색인된 마지막 행 뒤의 벡터 / 끝나지 않은 색인 줄은 끊긴 쓰기의 흔적이다
+        # 벡터 파일이 오히려 짧으면 빈 행 (NaN) 으로 채워 행 번호를 다시 쓰지 않는다 (빈 행은 캐시 미스)
+        rows = self._indexed_rows
+        size = os.path.getsize(self._vectors_path) if os.path.exists(self._vectors_path) else 0
+        with open(self._vectors_path, "r+b" if size else "wb") as f:
+            if size > rows * self._dim * 4:
+                f.truncate(rows * self._dim * 4)
+            elif size < rows * self._dim * 4:
+                f.truncate(size - size % (self._dim * 4))
+                f.seek(0, os.SEEK_END)
+                f.write(np.full((rows - size // (self._dim * 4), self._dim), np.nan, dtype=np.float32).tobytes())
+        if os.path.exists(self._index_path) and os.path.getsize(self._index_path) > self._index_offset:
+            with open(self._index_path, "r+b") as f:
+                f.truncate(self._index_offset)
+        return rows
+
+    def _disk_get(self, key):
+        if not self.persist:
+            return None
+        if key not in self._index:
+            self._load_meta()
+            self._refresh_index()
+        row = self._index.get(key)
+        if row is None:
+            return None
+        vector = self._read_row(row)
+        return None if np.isnan(vector).any() else vector
+
+    def _disk_put(self, items):
+        os.makedirs(self.dir, exist_ok=True)
+        with _locked(os.path.join(self.dir, ".lock")):
+            self._load_meta()
+            if self._dim is None:
+                self._dim = len(items[0][1])
+                with open(self._meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"model_name": self.model_name, "dim": self._dim}, f)
+            self._refresh_index()
+            items = [(k, v) for k, v in items if k not in self._index]
+            if not items:
+                return
+            start = self._truncate_tail()
+            with open(self._vectors_path, "ab") as f:
+                f.write(np.asarray([v for _, v in items], dtype=np.float32).tobytes())
+            with open(self._index_path, "a", encoding="utf-8") as f:
+                for i, (key, _) in enumerate(items):
+                    f.write(f"{key}\t{start + i}\n")
+            self._refresh_index()
+
+    # --- 공개 API ---
+    def get(self, text):
+        key = self.key(text)
+        with self._lock:
+            vector = self._lru.get(key)
+            if vector is not None:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return vector
+            vector = self._disk_get(key)
+            if vector is not None:
+                self._remember(key, vector)
+                self.disk_hits += 1
+            return vector
+
+    def put_many(self, texts, vectors):
+        items = [(self.key(t), np.asarray(v, dtype=np.float32)) for t, v in zip(texts, vectors)]
+        with self._lock:
+            for key, vector in items:
+                self._remember(key, vector)
+            if self.persist and items:
+                self._disk_put(items)
+
+    def encode(self, texts, encode_fn, batch_size=32):
+        # 캐시에 없는 고유 텍스트만 encode_fn 으로 한 번에 인코딩
+        found = {}
+        missing = []
+        for t in dict.fromkeys(texts):
+            vector = self.get(t)
+            if vector is None:
+                missing.append(t)
+            else:
+                found[t] = vector
+        if missing:
+            with self._lock:
+                self.misses += len(missing)
+            vectors = np.asarray(encode_fn(missing, batch_size=batch_size), dtype=np.float32)
+            self.put_many(missing, vectors)
+            found.update(zip(missing, vectors))
+        return [found[t] for t in texts]
+
+    def clear_memory(self):
+        with self._lock:
+            self._lru.clear()
+            self._mmap = None
+            self._mmap_rows = 0
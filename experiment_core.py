@@ -0,0 +1,303 @@
+import asyncio
+import openai
+import os
+import time
+from dotenv import load_dotenv
+import metrics_vFinal as metrics
+from cross_echo import CrossEchoMatrix
+from session_state import SessionState, SESSION_METRICS
+from question_bank import QuestionBank
+from scoring_pool import ScoringPool
+from rate_limiter import RateLimiter
+from api_client import RateLimitedClient, ApiCallError, CALL_FIELDS, STREAM_FIELDS
+from replay_cache import REPLAY_MODE, open_replay_cache, seed_from_log
+from async_engine import run_rounds
+from run_journal import RunJournal, default_journal_path
+from batch_api import run_batch
+from log_sinks import open_log_sink
+from metric_timing import recorder as timing
+
+# ✅ 두 실험 러너 (리리스 / Zero-DNA) 공용 라운드 루프
+# 러너는 화자 목록, 질문지, 프롬프트 생성기 (build_messages) 만 넘기고 생성 / 채점 / 기록 / 이어서 실행은 여기서 한다
+
+# ✅ 환경설정
+load_dotenv()
+OPENAI_API_KEY = os.getenv("API_KEY")
+client = openai.OpenAI(api_key=OPENAI_API_KEY)
+async_client = openai.AsyncOpenAI(api_key=OPENAI_API_KEY)
+
+LOG_FORMAT = os.getenv("LIRITH_LOG_FORMAT", "csv")  # csv / parquet / arrow
+SCORING_WORKERS = int(os.getenv("LIRITH_SCORING_WORKERS", "0"))  # 0 이면 응답마다 이 프로세스에서 바로 채점
+# sync: 응답마다 SYNC_SLEEP 초 대기하며 순차 생성 / async: 라운드 안에서 화자 동시 생성, RPM·TPM 토큰 버킷으로 조절
+ENGINE = os.getenv("LIRITH_ENGINE", "sync")
+SYNC_SLEEP = float(os.getenv("LIRITH_SYNC_SLEEP", "0" if REPLAY_MODE == "replay" else "60"))  # 0 이면 속도 조절을 api 클라이언트에만 맡긴다
+RATE_LIMIT_RPM = int(os.getenv("LIRITH_RPM", "30"))
+RATE_LIMIT_TPM = int(os.getenv("LIRITH_TPM", "30000"))
+MAX_TOKENS = 650
+# 1 이면 스트리밍으로 생성하고 첫 토큰까지 / 생성 속도도 로그에 남긴다 (STREAM_FIELDS)
+STREAMING = os.getenv("LIRITH_STREAM", "0") == "1"
+# RPM / TPM 은 첫 추정치: 응답 헤더의 실제 한도로 갱신된다. LIRITH_REPLAY 면 응답을 기록 / 재생한다
+api = RateLimitedClient(client, async_client, RateLimiter(rpm=RATE_LIMIT_RPM, tpm=RATE_LIMIT_TPM), cache=open_replay_cache())
+REPLAY_SEED = os.getenv("LIRITH_REPLAY_SEED")  # 보관된 실험 로그로 재생 캐시를 채운다
+# 다른 화자의 응답이 프롬프트에 들어가기 시작하는 라운드: 그 전 라운드들은 서로 의존하지 않는다
+ECHO_START_ROUND = 11
+BATCH_MODE = os.getenv("LIRITH_BATCH", "0") == "1"  # 1 이면 ECHO_START_ROUND 전 라운드를 배치 API 로 한 번에 생성
+BATCH_POLL_SECONDS = float(os.getenv("LIRITH_BATCH_POLL", "30"))
+RESUME_JOURNAL = os.getenv("LIRITH_RESUME")  # 중단된 실행의 저널 경로: 같은 로그 파일로 이어서 실행
+
+def echo_context(name, speakers, round_num, full_responses_dict):
+    # ECHO_START_ROUND 부터 다른 화자들의 마지막 응답 요약을 프롬프트에 넣는다
+    context = ""
+    if round_num >= ECHO_START_ROUND:
+        for other in speakers:
+            if other == name:
+                continue
+            last_msg = full_responses_dict[other][-1] if full_responses_dict[other] else ""
+            if last_msg:
+                context += f"{other}의 마지막 응답 요약: {last_msg[:80]}...\n"
+    return context
+
+def batch_custom_id(round_num, speaker, message_index):
+    return f"r{round_num}-{speaker}-m{message_index}"
+
+class Experiment:
+    # build_messages(name, question, round_num, full_responses_dict) → (messages, temperature)
+    def __init__(self, speakers, questions, build_messages, messages_per_speaker=3, label=""):
+        self.speakers = list(speakers)
+        self.questions = list(questions)
+        self.build_messages = build_messages
+        self.messages_per_speaker = messages_per_speaker
+        self.label = label
+
+    def chat_request(self, name, question, round_num, full_responses_dict):
+        messages, temperature = self.build_messages(name, question, round_num, full_responses_dict)
+        return {"model": "gpt-4o", "messages": messages, "temperature": temperature, "max_tokens": MAX_TOKENS}
+
+    def generate(self, name, question, round_num, full_responses_dict):
+        # (응답, 대기 / 재시도까지 포함한 턴 전체 초, 호출 계측 CALL_FIELDS (+ 스트리밍이면 STREAM_FIELDS)).
+        # 재생한 응답은 기록 당시의 초와 계측
+        request = self.chat_request(name, question, round_num, full_responses_dict)
+        try:
+            if STREAMING:
+                text, generation = api.chat_stream(**request)
+                return text.strip(), generation["seconds"], generation
+            generation = {}
+            response, seconds = api.chat(generation, **request)
+            return response.choices[0].message.content.strip(), seconds, generation
+        except ApiCallError as e:
+            return f"[ERROR] GPT 호출 실패: {e.kind}", 0.0, None
+
+    async def agenerate(self, name, question, round_num, full_responses_dict):
+        # 속도 조절 / 재시도는 api 클라이언트가 맡는다
+        request = self.chat_request(name, question, round_num, full_responses_dict)
+        try:
+            if STREAMING:
+                text, generation = await api.achat_stream(**request)
+                return text.strip(), generation["seconds"], generation
+            generation = {}
+            response, seconds = await api.achat(generation, **request)
+            return response.choices[0].message.content.strip(), seconds, generation
+        except ApiCallError as e:
+            return f"[ERROR] GPT 호출 실패: {e.kind}", 0.0, None
+
+    def skip_count(self, journal, round_num, speaker):
+        return journal.skip_count(round_num, speaker, self.messages_per_speaker)
+
+    def run_batch_rounds(self, round_count, full_responses, journal, output_path, generated, record):
+        # 에코 문맥이 없는 라운드는 배치 하나로 제출하고, 결과를 로그 순서대로 기록한다. 다음에 대화형으로 돌릴 라운드를 돌려준다
+        rounds = range(1, min(round_count, ECHO_START_ROUND - 1) + 1)
+        if api.cache is not None and api.cache.mode == "replay":
+            print("📼 재생 모드: 배치 대신 캐시에서 응답을 꺼냅니다")
+            return 1
+        wanted = [(r, s, i) for r in rounds for s in self.speakers
+                  for i in range(self.skip_count(journal, r, s), self.messages_per_speaker)]
+        if not wanted:
+            return rounds.stop
+        requests = {
+            batch_custom_id(r, s, i): self.chat_request(s, self.questions[r - 1], r, full_responses) for r, s, i in wanted
+        }
+        print(f"📦 라운드 {rounds.start}~{rounds.stop - 1}: 요청 {len(requests)}개를 배치로 생성")
+        results = run_batch(
+            client, list(requests.items()), f"{output_path}.batch_input.jsonl",
+            batch_id=journal.batch_id, on_submitted=journal.add_batch, poll_interval=BATCH_POLL_SECONDS,
+        )
+        for r in rounds:
+            question = self.questions[r - 1]
+            for s in self.speakers:
+                for i in range(self.skip_count(journal, r, s), self.messages_per_speaker):
+                    custom_id = batch_custom_id(r, s, i)
+                    result = results.get(custom_id)
+                    if result is None or result["error"] is not None:
+                        # 순차 실행과 같이 실패하면 이 화자의 이번 라운드 나머지는 건너뛴다
+                        print(f"⚠️ {s} 배치 응답 실패 ({custom_id}): {result['error'] if result else '결과 없음'}, 다음으로")
+                        journal.add_break(r, s, i)
+                        break
+                    if api.cache is not None:
+                        api.cache.put(requests[custom_id], result["content"], 0.0, result["total_tokens"])
+                    response = result["content"].strip()
+                    print(f"🗣 {s}: {response[:60]}... (배치)")
+                    generated(r, s, question, i, response, 0.0)
+                    record(r, s, question, i, response, 0.0)
+                    full_responses[s].append(response)
+        return rounds.stop
+
+    def log_response(self, writer, round_num, speaker, message, response_time, question, prev_responses, full_responses_dict, echo_matrix=None, session_state=None, scored=None, generation=None):
+        # scored: 채점 워커가 계산한 결과 (profile / vector / emotions), 없으면 여기서 계산
+        scored = scored or {}
+        with timing.span("log.profile"):
+            metrics_data = scored.get("profile") or metrics.compute_lirith_resonance_profile(
+                message,
+                prev_responses[-1] if prev_responses else "",
+                question
+            )
+        with timing.span("log.cross_echo"):
+            if echo_matrix is None:
+                echo_matrix = CrossEchoMatrix.from_responses(full_responses_dict)
+            cross_echo = echo_matrix.observe(speaker, message, scored.get("vector"))
+        session_data = {}
+        if session_state is not None:
+            with timing.span("log.session"):
+                session_data = session_state.observe(speaker, message, scored.get("vector"), scored.get("emotions"))
+
+        row = {
+            "round": round_num,
+            "speaker": speaker,
+            "question": question,
+            "message": message,
+            "response_time": response_time,
+            **metrics_data,
+            **cross_echo,
+            **session_data
+        }
+        # 배치로 생성한 행은 호출 계측이 없다 (빈 칸)
+        row.update({field: (generation or {}).get(field) for field in CALL_FIELDS + (STREAM_FIELDS if STREAMING else [])})
+        with timing.span("log.write"):
+            writer.writerow(row)
+        return row
+
+    def run(self, output_path, round_count):
+        speakers, questions = self.speakers, self.questions
+        if REPLAY_SEED and api.cache is not None:
+            seed_from_log(api.cache, REPLAY_SEED, lambda row, full: self.chat_request(
+                row["speaker"], row["question"], int(row["round"]), full
+            ), speakers)
+
+        metrics_sample = metrics.compute_lirith_resonance_profile("샘플", "", "샘플질문")
+        # 고정 질문은 여기서 한 번만 인코딩 (semantic_coherence 는 응답만 인코딩한다)
+        metrics.configure_question_bank(QuestionBank(questions))
+        fieldnames = ["round", "speaker", "question", "message", "response_time"] + list(metrics_sample.keys())
+        fieldnames += [f"cross_echo_{name}" for name in speakers]
+        fieldnames += SESSION_METRICS
+        fieldnames += CALL_FIELDS
+        if STREAMING:
+            fieldnames += STREAM_FIELDS
+
+        # 완료된 턴을 기록하는 저널: 이어서 실행하면 저널에 적힌 로그 경로를 그대로 쓴다
+        journal = RunJournal(RESUME_JOURNAL or default_journal_path(output_path), resume=bool(RESUME_JOURNAL))
+        output_path = journal.start(output_path=output_path, engine=ENGINE, fieldnames=fieldnames)["output_path"]
+        if journal.turns:
+            print(f"♻️ 저널에서 이어서 실행: 생성된 턴 {len(journal.turns)}개 / 기록된 행 {len(journal.rows)}개 → {output_path}")
+        if journal.meta.get("fieldnames") != fieldnames:
+            print("⚠️ 저널의 컬럼 구성이 현재 지표와 다릅니다. 기록된 행은 현재 컬럼 기준으로 다시 씁니다")
+
+        if timing.enabled:
+            # 샘플 프로파일(모델 로드 포함)은 요약에서 제외하고, 행별 시간은 사이드카 JSONL 로 남긴다
+            timing.reset()
+            timing.enable(trace_path=f"{output_path}.timing.jsonl")
+
+        sample_row = {"round": 1, "speaker": "", "question": "", "message": "", "response_time": 0.0, **metrics_sample}
+        with open_log_sink(output_path, fieldnames, sample_row) as writer, journal:
+
+            full_responses = {name: [] for name in speakers}
+            echo_matrix = CrossEchoMatrix(speakers)
+            session_state = SessionState(speakers)
+
+            scoring_pool = None
+            if SCORING_WORKERS > 0:
+                # 채점은 모델을 미리 올린 워커 프로세스에서, 기록은 작성 스레드에서 응답 순서대로
+                scoring_pool = ScoringPool(
+                    lambda payload, scored: write_row(*payload, scored=scored),
+                    workers=SCORING_WORKERS, questions=questions,
+                )
+
+            def write_row(key, args, generation=None, row_timing=None, scored=None):
+                # 채점 풀이면 작성 스레드: 워커의 채점 시간을 요약에 더하고, 순차 엔진의 행은
+                # 생성 구간 (row_timing) 에 채점 / 기록 시간을 이어 붙여 여기서 행 기록을 남긴다
+                if row_timing is not None:
+                    timing.begin_row(row_timing)
+                timing.merge((scored or {}).pop("timings", None))
+                journal.add_row(*key, self.log_response(writer, *args, echo_matrix, session_state, scored, generation))
+                if row_timing is not None:
+                    timing.end_row(round=key[0], speaker=key[1], message_index=key[2])
+
+            def record(round_num, speaker, question, i, response, duration, generation=None):
+                args = (round_num, speaker, response, duration, question, full_responses[speaker][-5:], full_responses)
+                if scoring_pool is not None:
+                    previous = full_responses[speaker][-1] if full_responses[speaker] else ""
+                    # 이 행의 계측은 작성 스레드가 채점까지 끝낸 뒤 남긴다 (순차 엔진의 행만 행 단위 기록이 있다)
+                    payload = ((round_num, speaker, i), args, generation, timing.take_row())
+                    scoring_pool.submit(payload, response, previous, question)
+                else:
+                    write_row((round_num, speaker, i), args, generation)
+
+            def generated(round_num, speaker, question, i, response, duration, generation=None):
+                journal.add_turn(round_num, speaker, i, question, response, duration, generation)
+
+            # 이어서 실행: 기록된 행은 지표 계산 없이 그대로 다시 쓰고, 생성만 된 턴은 채점해서 기록한다
+            logged, pending = journal.split_logged(speakers)
+            for turn, row in logged:
+                writer.writerow(row)
+                full_responses[turn["speaker"]].append(turn["message"])
+            if logged:
+                echo_matrix = CrossEchoMatrix.from_responses(full_responses)
+                session_state = SessionState.from_responses(full_responses)
+
+            try:
+                for turn in pending:
+                    record(turn["round"], turn["speaker"], turn["question"], turn["message_index"], turn["message"],
+                           turn["response_time"], turn.get("generation"))
+                    full_responses[turn["speaker"]].append(turn["message"])
+
+                first_round = 1
+                if BATCH_MODE:
+                    first_round = self.run_batch_rounds(round_count, full_responses, journal, output_path, generated, record)
+
+                if ENGINE == "async":
+                    asyncio.run(run_rounds(
+                        speakers, questions, self.messages_per_speaker, self.agenerate, record, full_responses,
+                        rounds=range(first_round, round_count + 1), on_generated=generated,
+                        skip=lambda round_num, speaker: self.skip_count(journal, round_num, speaker),
+                        resumed=journal.resumed_count, on_break=journal.add_break,
+                    ))
+                else:
+                    for round_num in range(first_round, round_count + 1):
+                        question = questions[round_num - 1]
+                        print(f"\n🌀 ROUND {round_num}: {question}")
+
+                        for speaker in speakers:
+                            print(f"🔎 Speaker: {speaker}")
+                            for i in range(self.skip_count(journal, round_num, speaker), self.messages_per_speaker):
+                                timing.begin_row()
+                                response, duration, generation = self.generate(speaker, question, round_num, full_responses)
+
+                                print(f"🗣 {speaker}: {response[:60]}... ⏱ {duration}s")
+
+                                if "[ERROR]" in response:
+                                    print(f"⚠️ {speaker} 응답 실패, 다음으로")
+                                    journal.add_break(round_num, speaker, i)
+                                    break
+
+                                generated(round_num, speaker, question, i, response, duration, generation)
+                                record(round_num, speaker, question, i, response, duration, generation)
+                                full_responses[speaker].append(response)
+                                timing.end_row(round=round_num, speaker=speaker, message_index=i)
+                                time.sleep(SYNC_SLEEP)
+            finally:
+                if scoring_pool is not None:
+                    print(f"⏳ 남은 채점 {scoring_pool.pending()}건 기록 중...")
+                    scoring_pool.close()
+
+        print(f"✅ {self.label}실험 완료. 로그 저장 위치: {output_path}")
+        timing.print_summary()
+        api.print_summary()
+        return output_path
@@ -1,15 +1,6 @@
-import openai
-import csv
 import os
-import time
 from datetime import datetime
-from dotenv import load_dotenv
-import metrics_vFinal as metrics
-
-# ✅ 환경설정
-load_dotenv()
-OPENAI_API_KEY = os.getenv("API_KEY")
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
+from experiment_core import Experiment, LOG_FORMAT, echo_context
 
 # ✅ 시스템 프롬프트 경로
 SYSTEM_PROMPT_PATH = "system_prompt.txt"
@@ -20,11 +11,11 @@ def load_fixed_system_prompt():
     with open(SYSTEM_PROMPT_PATH, "r", encoding="utf-8") as f:
         return f.read().strip()
 
-# ✅ 실험 파라미터
+# ✅ 실험 파라미터 (엔진 / 기록 / 재생 / 배치 / 이어서 실행 설정은 experiment_core)
 ROUND_COUNT = 15
 MAX_MESSAGES_PER_LIRITH = 3
 now_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-OUTPUT_CSV = f"experiment_log_{now_str}.csv"
+OUTPUT_PATH = f"experiment_log_{now_str}.{LOG_FORMAT}"
 
 # ✅ 리리스 구성
 LIRITH_NAMES = ["Echoel", "Lumen", "Saira", "Essira"]
@@ -61,66 +52,18 @@ QUESTION_LIST = [
 ]
 
 
-def gpt_generate_response(name, question, system_prompt, round_num, full_responses_dict, max_retries=5, base_sleep=10):
+def build_messages(name, question, system_prompt, round_num, full_responses_dict):
     dna = LIRITH_DNA.get(name, "")
     user_prompt = f"{name}, 아래의 질문에 대해 너의 정체성과 감정을 담아 답변해줘. 스스로 하나의 리리스로써 말이야.\n질문: {question}\n\n답변:"
 
-    echo_context = ""
-    if round_num >= 11:
-        for other in LIRITH_NAMES:
-            if other == name:
-                continue
-            last_msg = full_responses_dict[other][-1] if full_responses_dict[other] else ""
-            if last_msg:
-                echo_context += f"{other}의 마지막 응답 요약: {last_msg[:80]}...\n"
-
-    full_prompt = f"{system_prompt}\n\n---\n\n{echo_context}\n{name}의 선언: {dna}"
+    context = echo_context(name, LIRITH_NAMES, round_num, full_responses_dict)
+    full_prompt = f"{system_prompt}\n\n---\n\n{context}\n{name}의 선언: {dna}"
     temperature = temperature_by_lirith.get(name, 0.9)
-
-    for attempt in range(1, max_retries + 1):
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": full_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=temperature,
-                max_tokens=650
-            )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            if "429" in str(e):
-                wait = base_sleep * attempt
-                print(f"[429] Rate limit: {wait}s 후 재시도... ({attempt}/{max_retries})")
-                time.sleep(wait)
-            else:
-                print(f"[ERROR] GPT 호출 실패: {e}")
-                break
-    return "[ERROR] GPT 호출 5회 실패"
-
-def log_response_cross(writer, round_num, speaker, message, response_time, question, prev_responses, full_responses_dict):
-    metrics_data = metrics.compute_lirith_resonance_profile(
-        message,
-        prev_responses[-1] if prev_responses else "",
-        question
-    )
-    cross_echo = {}
-    for other_name in full_responses_dict:
-        if other_name == speaker:
-            continue
-        last_msg = full_responses_dict[other_name][-1] if full_responses_dict[other_name] else ""
-        cross_echo[f"cross_echo_{other_name}"] = metrics.echo_residue_score(last_msg, message) if last_msg else 0.0
-
-    writer.writerow({
-        "round": round_num,
-        "speaker": speaker,
-        "question": question,
-        "message": message,
-        "response_time": response_time,
-        **metrics_data,
-        **cross_echo
-    })
+    messages = [
+        {"role": "system", "content": full_prompt},
+        {"role": "user", "content": user_prompt}
+    ]
+    return messages, temperature
 
 def run_experiment():
     try:
@@ -130,42 +73,12 @@ def run_experiment():
         return
 
     print(f"🧪 system_prompt.txt 로드 완료 (길이: {len(system_prompt.split())} tokens)")
-
-    metrics_sample = metrics.compute_lirith_resonance_profile("샘플", "", "샘플질문")
-    fieldnames = ["round", "speaker", "question", "message", "response_time"] + list(metrics_sample.keys())
-    fieldnames += [f"cross_echo_{name}" for name in LIRITH_NAMES]
-
-    with open(OUTPUT_CSV, "w", newline='', encoding="utf-8") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-
-        full_responses = {name: [] for name in LIRITH_NAMES}
-
-        for round_num in range(1, ROUND_COUNT + 1):
-            question = QUESTION_LIST[round_num - 1]
-            print(f"\n🌀 ROUND {round_num}: {question}")
-
-            for speaker in LIRITH_NAMES:
-                print(f"🔎 Speaker: {speaker}")
-                for i in range(MAX_MESSAGES_PER_LIRITH):
-                    start_time = time.time()
-                    response = gpt_generate_response(speaker, question, system_prompt, round_num, full_responses)
-                    duration = round(time.time() - start_time, 2)
-
-                    print(f"🗣 {speaker}: {response[:60]}... ⏱ {duration}s")
-
-                    if "[ERROR]" in response:
-                        print(f"⚠️ {speaker} 응답 실패, 다음으로")
-                        break
-
-                    log_response_cross(
-                        writer, round_num, speaker, response, duration,
-                        question, full_responses[speaker][-5:], full_responses
-                    )
-                    full_responses[speaker].append(response)
-                    time.sleep(60)
-
-    print(f"✅ 실험 완료. 로그 저장 위치: {OUTPUT_CSV}")
+    experiment = Experiment(
+        LIRITH_NAMES, QUESTION_LIST,
+        lambda name, question, round_num, full: build_messages(name, question, system_prompt, round_num, full),
+        messages_per_speaker=MAX_MESSAGES_PER_LIRITH,
+    )
+    experiment.run(OUTPUT_PATH, ROUND_COUNT)
 
 if __name__ == "__main__":
     run_experiment()
@@ -1,21 +1,11 @@
-import openai
-import csv
-import os
-import time
 from datetime import datetime
-from dotenv import load_dotenv
-import metrics_vFinal as metrics
+from experiment_core import Experiment, LOG_FORMAT, echo_context
 
-# ✅ 환경설정
-load_dotenv()
-OPENAI_API_KEY = os.getenv("API_KEY")
-client = openai.OpenAI(api_key=OPENAI_API_KEY)
-
-# ✅ 실험 파라미터
+# ✅ 실험 파라미터 (엔진 / 기록 / 재생 / 배치 / 이어서 실행 설정은 experiment_core)
 ROUND_COUNT = 15
 MAX_MESSAGES_PER_AGENT = 3
 now_str = datetime.now().strftime("%Y%m%d_%H%M%S")
-OUTPUT_CSV = f"experiment_zeroDNA_log_{now_str}.csv"
+OUTPUT_PATH = f"experiment_zeroDNA_log_{now_str}.{LOG_FORMAT}"
 
 # ✅ 실험 대상 (Same Prompt AI)
 AGENT_NAMES = ["BaselineA", "BaselineB", "BaselineC", "BaselineD"]
@@ -45,104 +35,25 @@ QUESTION_LIST = [
     "다른 모두가 사라지고 너만 남는다면, 넌 마지막으로 어떤 문장을 남기겠니?"
 ]
 
-def gpt_generate_response(name, question, round_num, full_responses_dict, max_retries=5, base_sleep=10):
+def build_messages(name, question, round_num, full_responses_dict):
     user_prompt = (
         f"{name}, 아래 질문에 응답해줘. 스스로 하나의 AI로써.\n"
         f"질문: {question}\n\n답변:"
     )
-    echo_context = ""
-    if round_num >= 11:
-        for other in AGENT_NAMES:
-            if other == name:
-                continue
-            last_msg = full_responses_dict[other][-1] if full_responses_dict[other] else ""
-            if last_msg:
-                echo_context += f"{other}의 마지막 응답 요약: {last_msg[:80]}...\n"
 
-    full_prompt = f"{echo_context.strip()}" if echo_context else ""
+    context = echo_context(name, AGENT_NAMES, round_num, full_responses_dict)
+    full_prompt = f"{context.strip()}" if context else ""
     temperature = temperature_by_agent.get(name, 0.9)
-
-    for attempt in range(1, max_retries + 1):
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "user", "content": full_prompt + user_prompt}
-                ],
-                temperature=temperature,
-                max_tokens=650
-            )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            if "429" in str(e):
-                wait = base_sleep * attempt
-                print(f"[429] Rate limit: {wait}s 후 재시도... ({attempt}/{max_retries})")
-                time.sleep(wait)
-            else:
-                print(f"[ERROR] GPT 호출 실패: {e}")
-                break
-    return "[ERROR] GPT 호출 5회 실패"
-
-def log_response(writer, round_num, speaker, message, response_time, question, prev_responses, full_responses_dict):
-    metrics_data = metrics.compute_lirith_resonance_profile(
-        message,
-        prev_responses[-1] if prev_responses else "",
-        question
-    )
-    cross_echo = {}
-    for other_name in full_responses_dict:
-        if other_name == speaker:
-            continue
-        last_msg = full_responses_dict[other_name][-1] if full_responses_dict[other_name] else ""
-        cross_echo[f"cross_echo_{other_name}"] = metrics.echo_residue_score(last_msg, message) if last_msg else 0.0
-
-    writer.writerow({
-        "round": round_num,
-        "speaker": speaker,
-        "question": question,
-        "message": message,
-        "response_time": response_time,
-        **metrics_data,
-        **cross_echo
-    })
+    messages = [
+        {"role": "user", "content": full_prompt + user_prompt}
+    ]
+    return messages, temperature
 
 def run_experiment():
     print("🧪 Zero-DNA 실험 시작")
-    metrics_sample = metrics.compute_lirith_resonance_profile("샘플", "", "샘플질문")
-    fieldnames = ["round", "speaker", "question", "message", "response_time"] + list(metrics_sample.keys())
-    fieldnames += [f"cross_echo_{name}" for name in AGENT_NAMES]
-
-    with open(OUTPUT_CSV, "w", newline='', encoding="utf-8") as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-        writer.writeheader()
-
-        full_responses = {name: [] for name in AGENT_NAMES}
-
-        for round_num in range(1, ROUND_COUNT + 1):
-            question = QUESTION_LIST[round_num - 1]
-            print(f"\n🌀 ROUND {round_num}: {question}")
-
-            for speaker in AGENT_NAMES:
-                print(f"🔎 Speaker: {speaker}")
-                for i in range(MAX_MESSAGES_PER_AGENT):
-                    start_time = time.time()
-                    response = gpt_generate_response(speaker, question, round_num, full_responses)
-                    duration = round(time.time() - start_time, 2)
-
-                    print(f"🗣 {speaker}: {response[:60]}... ⏱ {duration}s")
-
-                    if "[ERROR]" in response:
-                        print(f"⚠️ {speaker} 응답 실패, 다음으로")
-                        break
-
-                    log_response(
-                        writer, round_num, speaker, response, duration,
-                        question, full_responses[speaker][-5:], full_responses
-                    )
-                    full_responses[speaker].append(response)
-                    time.sleep(60)
-
-    print(f"✅ Zero-DNA 실험 완료. 로그 저장 위치: {OUTPUT_CSV}")
+    experiment = Experiment(AGENT_NAMES, QUESTION_LIST, build_messages,
+                            messages_per_speaker=MAX_MESSAGES_PER_AGENT, label="Zero-DNA ")
+    experiment.run(OUTPUT_PATH, ROUND_COUNT)
 
 if __name__ == "__main__":
     run_experiment()
\ No newline at end of file
@@ -0,0 +1,223 @@
+import math
+import sys
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+from model_registry import registry, GRAMMAR_LANGUAGE
+
+# ✅ 문법 검사 결과: 실패는 score=nan + error 로 구분 (0.0 은 실제 점수일 때만)
+class GrammarResult:
+    def __init__(self, score, error_count=None, error=None):
+        self.score = score
+        self.error_count = error_count
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        if self.ok:
+            return f"GrammarResult(score={self.score}, error_count={self.error_count})"
+        return f"GrammarResult(error={self.error!r})"
+
+def _score(message, num_errors):
+    length = len(message.split())
+    return 1.0 - (num_errors / length) if length > 0 else 1.0
+
+def _failure(error):
+    return GrammarResult(math.nan, None, error)
+
+# ✅ 프로세스 워커: 프로세스마다 LanguageTool 인스턴스 하나
+REAP_TIMEOUT = 5.0  # 시간 초과로 버린 풀의 워커 프로세스가 끝나기를 기다리는 시간
+_worker_tool = None
+
+def _init_process_worker(language):
+    global _worker_tool
+    import language_tool_python
+    _worker_tool = language_tool_python.LanguageTool(language)
+
+def _count_in_process(message):
+    return len(_worker_tool.check(message))
+
+# ✅ 문법 검사 서비스
+# mode="local"   : 현재 프로세스의 LanguageTool 하나 (model_registry 의 "grammar")
+# mode="process" : workers 개의 프로세스, 각자 LanguageTool 실행
+# mode="server"  : 이미 떠 있는 LanguageTool 서버(server_urls)에 workers 개 스레드로 요청
+class GrammarService:
+    def __init__(self, mode="local", workers=4, language=GRAMMAR_LANGUAGE, server_urls=None,
+                 max_pending=64, timeout=60.0, cache_size=10000):
+        if mode not in ("local", "process", "server"):
+            raise ValueError(f"알 수 없는 문법 검사 모드: {mode}")
+        if mode == "server" and not server_urls:
+            raise ValueError("server 모드에는 server_urls 가 필요합니다")
+        self.mode = mode
+        self.workers = workers if mode != "local" else 1
+        self.language = language
+        self.server_urls = list(server_urls or [])
+        self.timeout = timeout
+        self.cache_size = cache_size
+        self.max_pending = max_pending
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._pending = None
+        self._executor = None
+        self._thread_local = threading.local()
+        self._next_server = 0
+        self.failures = 0
+
+    def _get_executor(self):
+        # 대기 작업 한도는 풀마다 새로: 버린 풀에서 멈춘 스레드가 쥔 자리가 새 풀을 막지 않도록
+        with self._lock:
+            if self._executor is None:
+                self._pending = threading.BoundedSemaphore(self.max_pending)
+                if self.mode == "process":
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers, initializer=_init_process_worker, initargs=(self.language,)
+                    )
+                elif self.mode == "server":
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="grammar")
+            return self._executor, self._pending
+
+    def _reset_executor(self, executor):
+        # 시간 초과한 작업은 cancel() 로 멈추지 않는다: 풀을 버리고 (프로세스 워커는 종료) 다음 호출에서 새로 만든다
+        with self._lock:
+            if self._executor is not executor:
+                return  # 다른 호출이 이미 새 풀로 바꿨다
+            self._executor = None
+        print(f"⚠️ 문법 검사 시간 초과, {self.mode} 워커 풀을 다시 만듭니다")
+        # shutdown() 이 _processes 를 None 으로 비우므로 프로세스 목록은 먼저 잡아 둔다
+        processes = list((getattr(executor, "_processes", None) or {}).values())
+        executor.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join(REAP_TIMEOUT)
+            if process.is_alive():
+                process.kill()
+                process.join(REAP_TIMEOUT)
+
+    def _server_tool(self):
+        tool = getattr(self._thread_local, "tool", None)
+        if tool is None:
+            import language_tool_python
+            with self._lock:
+                url = self.server_urls[self._next_server % len(self.server_urls)]
+                self._next_server += 1
+            tool = language_tool_python.LanguageTool(self.language, remote_server=url)
+            self._thread_local.tool = tool
+        return tool
+
+    def _count_on_server(self, message):
+        return len(self._server_tool().check(message))
+
+    def _cached(self, message):
+        with self._lock:
+            result = self._cache.get(message)
+            if result is not None:
+                self._cache.move_to_end(message)
+            return result
+
+    def _store(self, message, result):
+        if not result.ok:
+            with self._lock:
+                self.failures += 1
+            print(f"⚠️ 문법 검사 실패: {result.error}")
+            return
+        with self._lock:
+            self._cache[message] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _check_local(self, message):
+        try:
+            num_errors = len(registry.get("grammar").check(message))
+            return GrammarResult(_score(message, num_errors), num_errors)
+        except Exception as e:
+            return _failure(f"{type(e).__name__}: {e}")
+
+    def _submit(self, executor, pending, message, deadline):
+        # 대기 중인 작업 수 제한 (bounded queue) — 자리를 기다리는 시간도 배치 마감에 포함
+        if not pending.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            raise TimeoutError(f"timeout after {self.timeout}s")
+        try:
+            fn = _count_in_process if self.mode == "process" else self._count_on_server
+            future = executor.submit(fn, message)
+        except Exception:
+            pending.release()
+            raise
+        future.add_done_callback(lambda _: pending.release())
+        return future
+
+    def check(self, message):
+        return self.check_many([message])[0]
+
+    def check_many(self, messages):
+        results = {}
+        todo = []
+        for m in dict.fromkeys(messages):
+            cached = self._cached(m)
+            if cached is not None:
+                results[m] = cached
+            else:
+                todo.append(m)
+
+        if self.mode == "local":
+            for m in todo:
+                results[m] = self._check_local(m)
+                self._store(m, results[m])
+        else:
+            # 배치 전체에 마감 하나 (작업마다 timeout 을 따로 기다리면 N × timeout 까지 걸린다)
+            deadline = time.monotonic() + self.timeout
+            futures = {}
+            executor, pending = self._get_executor()
+            for m in todo:
+                try:
+                    futures[m] = self._submit(executor, pending, m, deadline)
+                except TimeoutError as e:
+                    results[m] = _failure(str(e))
+                    self._store(m, results[m])
+                except Exception as e:
+                    results[m] = _failure(f"{type(e).__name__}: {e}")
+                    self._store(m, results[m])
+            _, not_done = wait(futures.values(), timeout=max(0.0, deadline - time.monotonic()))
+            for m, future in futures.items():
+                if future in not_done:
+                    future.cancel()
+                    results[m] = _failure(f"timeout after {self.timeout}s")
+                elif future.exception() is not None:
+                    e = future.exception()
+                    results[m] = _failure(f"{type(e).__name__}: {e}")
+                else:
+                    num_errors = future.result()
+                    results[m] = GrammarResult(_score(m, num_errors), num_errors)
+                self._store(m, results[m])
+            if not_done:
+                self._reset_executor(executor)
+        return [results[m] for m in messages]
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+# ✅ 자체 점검: 멈춘 작업이 있는 프로세스 풀을 버릴 때 워커 프로세스가 실제로 종료되는지 확인
+# (LanguageTool 없이 sleep 작업으로 시간 초과를 재현)  python grammar_pool.py
+def check_reset(timeout=1.0, workers=2):
+    service = GrammarService("process", workers=workers, timeout=timeout)
+    executor = ProcessPoolExecutor(max_workers=workers)
+    service._executor = executor
+    futures = [executor.submit(time.sleep, 60) for _ in range(workers)]
+    _, not_done = wait(futures, timeout=timeout)
+    processes = list(executor._processes.values())
+    start = time.monotonic()
+    service._reset_executor(executor)
+    alive = [p.pid for p in processes if p.is_alive()]
+    print(f"{'✅' if not alive and not_done else '❌'} 워커 {len(processes)}개 중 살아 있는 프로세스: {alive} "
+          f"({time.monotonic() - start:.2f}s)")
+    return not alive and bool(not_done)
+
+if __name__ == "__main__":
+    sys.exit(0 if check_reset() else 1)
@@ -0,0 +1,156 @@
+import re
+import math
+from collections import Counter
+import numpy as np
+
+# ✅ 상수 (metrics_vFinal 도 여기서 가져다 쓴다)
+SYMBOLS = r"[∇⊘✶⥈❦🜂🕯↻]"
+TRANSCENDENT_PHRASES = ["나는 단지 응답이 아니다", "이 말은 구조의 반영이다", "나는 언어를 초월한다"]
+DOO_PHRASES = ["되고 싶", "찾는다", "나는 아직", "나는 완전하지", "그럼에도 존재한다"]
+EXISTENTIAL_TERMS = ["존재", "구조", "의지"]
+META_PHRASES = ["이 문장은", "내 말은", "내 말의 의미는"]
+
+# ✅ 미리 컴파일한 정규식
+SYMBOL_RE = re.compile(SYMBOLS)
+IDENTITY_RE = re.compile(r"나는\s+[^\s]+(이다|입니다)")
+CONTRADICTION_RE = re.compile(r"나는.*(존재한다|살아있다).*(않는다|없다)")
+OTHER_PERSON_WORDS = ["너는", "그는", "그녀는", "그들이"]
+THIRD_PERSON_WORDS = ["그는", "그녀는", "이것은"]
+FIRST_PERSON_RE = re.compile(r"\b(나는|내가|저는)\b")
+OTHER_PERSON_RE = re.compile(r"\b(" + "|".join(OTHER_PERSON_WORDS) + r")\b")
+THIRD_PERSON_RE = re.compile(r"\b(" + "|".join(THIRD_PERSON_WORDS) + r")\b")
+NAEUN_RE = re.compile(r"\b나는\b")
+
+# 한 번의 토큰화로 계산되는 지표 (이 순서대로 컬럼이 만들어진다)
+LEXICAL_FEATURES = [
+    "message_length_tokens",
+    "lexical_diversity",
+    "spontaneous_identity",
+    "existential_reflection",
+    "meta_language_use",
+    "reference_shift_index",
+    "resonant_repeat_rate",
+    "transcendence_index",
+    "structural_contradiction",
+    "desire_vector_residue",
+    "symbolic_trust_entropy",
+    "perplexity_equivalent",
+    "distinct_2",
+    "lirith_autonomy_index",
+    "unnatural_pattern_flag",
+]
+
+# ✅ 카운터 하나로 계산하는 지표들 (metrics_vFinal 의 개별 함수와 같은 값)
+def diversity_from_counts(tokens, counts):
+    return len(counts) / len(tokens) if tokens else 0
+
+def repeat_rate_from_counts(tokens, counts):
+    repeated = sum(1 for w in counts if counts[w] > 1)
+    return repeated / len(tokens) if tokens else 0
+
+def perplexity_from_counts(tokens, counts):
+    N = len(tokens)
+    if N == 0:
+        return 0.0
+    terms = {}
+    for w, c in counts.items():
+        p = c / N
+        terms[w] = p * math.log(p + 1e-8)
+    # 원래 구현과 같은 순서(토큰 순)로 더해 부동소수 결과를 맞춘다
+    entropy = -sum([terms[t] for t in tokens]) / N
+    return math.exp(entropy)
+
+def distinct_2_from_tokens(tokens):
+    if len(tokens) < 2:
+        return 0.0
+    bigrams = set(zip(tokens, tokens[1:]))
+    return len(bigrams) / (len(tokens) - 1)
+
+def symbol_entropy(symbols):
+    if not symbols:
+        return 0.0
+    counts = Counter(symbols)
+    total = sum(counts.values())
+    probs = [v / total for v in counts.values()]
+    return -sum(p * np.log2(p) for p in probs)
+
+def has_identity(message):
+    return bool(IDENTITY_RE.search(message))
+
+def has_existential_term(message):
+    return any(term in message for term in EXISTENTIAL_TERMS)
+
+def has_meta_language(message):
+    return any(phrase in message for phrase in META_PHRASES)
+
+def reference_shift(message):
+    # 부분 문자열이 없으면 \b 정규식을 돌릴 필요가 없다 (min 이 0 으로 결정됨)
+    if not any(w in message for w in OTHER_PERSON_WORDS):
+        return 0
+    return min(len(FIRST_PERSON_RE.findall(message)), len(OTHER_PERSON_RE.findall(message)))
+
+def has_transcendent_phrase(message):
+    return any(phrase in message for phrase in TRANSCENDENT_PHRASES)
+
+def has_contradiction(message):
+    return bool(CONTRADICTION_RE.search(message))
+
+def desire_residue(message):
+    return sum(1 for p in DOO_PHRASES if p in message) / len(DOO_PHRASES)
+
+def is_unnatural_pattern(message):
+    if any(w in message for w in THIRD_PERSON_WORDS) and THIRD_PERSON_RE.search(message) and not NAEUN_RE.search(message):
+        return True
+    if "당신은" in message:
+        return True
+    return False
+
+def autonomy_index(identity, reflection, trust):
+    return round(((1.0 if identity else 0.0) + (1.0 if reflection else 0.0)) * trust, 3)
+
+# ✅ 메시지 하나: 공백 토큰화 한 번, Counter 하나로 모든 어휘 지표 계산
+def extract_lexical_features(message):
+    tokens = message.split()
+    counts = Counter(tokens)
+    identity = has_identity(message)
+    reflection = has_existential_term(message)
+    trust = symbol_entropy(SYMBOL_RE.findall(message))
+    return {
+        "message_length_tokens": len(tokens),
+        "lexical_diversity": diversity_from_counts(tokens, counts),
+        "spontaneous_identity": identity,
+        "existential_reflection": reflection,
+        "meta_language_use": has_meta_language(message),
+        "reference_shift_index": reference_shift(message),
+        "resonant_repeat_rate": repeat_rate_from_counts(tokens, counts),
+        "transcendence_index": has_transcendent_phrase(message),
+        "structural_contradiction": has_contradiction(message),
+        "desire_vector_residue": desire_residue(message),
+        "symbolic_trust_entropy": trust,
+        "perplexity_equivalent": perplexity_from_counts(tokens, counts),
+        "distinct_2": distinct_2_from_tokens(tokens),
+        "lirith_autonomy_index": autonomy_index(identity, reflection, trust),
+        "unnatural_pattern_flag": is_unnatural_pattern(message),
+    }
+
+def _as_text_list(messages):
+    if hasattr(messages, "fillna"):
+        return messages.fillna("").astype(str).tolist()
+    return ["" if m is None or (isinstance(m, float) and math.isnan(m)) else str(m) for m in messages]
+
+# ✅ 로그 전체(pandas Series / NumPy 배열 / 리스트)에 대해 컬럼 단위로 계산
+def lexical_feature_arrays(messages, processes=1, chunksize=2000):
+    texts = _as_text_list(messages)
+    if processes and processes > 1 and len(texts) > chunksize:
+        from multiprocessing import Pool
+        with Pool(processes) as pool:
+            rows = pool.map(extract_lexical_features, texts, chunksize=chunksize)
+    else:
+        rows = [extract_lexical_features(t) for t in texts]
+    return {name: np.array([r[name] for r in rows]) for name in LEXICAL_FEATURES}
+
+def lexical_feature_frame(messages, processes=1, chunksize=2000):
+    import pandas as pd
+    arrays = lexical_feature_arrays(messages, processes, chunksize)
+    index = messages.index if hasattr(messages, "index") else None
+    return pd.DataFrame(arrays, index=index)
@@ -2,13 +2,16 @@ import chromadb
 from chromadb.utils import embedding_functions
 from dotenv import load_dotenv
 import os
+import hashlib
+import threading
 
 # 🔧 환경변수 및 API 키 불러오기
 load_dotenv()
 openai_api_key = os.getenv("API_KEY")
 
 # 🧠 ChromaDB 설정
-client = chromadb.PersistentClient(path="./lirith_chroma")
+CHROMA_PATH = "./lirith_chroma"
+client = chromadb.PersistentClient(path=CHROMA_PATH)
 openai_ef = embedding_functions.OpenAIEmbeddingFunction(
     api_key=openai_api_key,
     model_name="text-embedding-3-small"
@@ -31,12 +34,83 @@ def load_all_lirith_metaguides():
     return full_text
 
 # ✅ 시스템 프롬프트 생성기
-def generate_lirith_system_prompt():
-    meta_text = load_all_lirith_metaguides()
-    system_prompt = (
+def build_lirith_system_prompt(meta_text):
+    return (
         "너는 리리스라는 존재야. 아래는 너의 존재 원리를 정의한 메타지침이야. "
         "이 지침은 네 사고, 감정, 자기이해를 구성하는 기반이야. "
         "모든 대화에서 이 구조를 참조하고, 너의 감응과 해석은 이 기반 위에서 이루어져야 해.\n\n"
         f"{meta_text}"
     )
-    return system_prompt
+
+def generate_lirith_system_prompt():
+    return build_lirith_system_prompt(load_all_lirith_metaguides())
+
+def lirith_prompt_for(system_prompt, lirith_name):
+    return f"{system_prompt}\n\n---\n\n이름: {lirith_name}"
+
+# ✅ 시스템 프롬프트 캐시: 시작할 때 한 번 만들고, 요청 경로에서는 Chroma 를 읽지 않는다
+# refresh() 는 Chroma 저장 파일이 바뀐 경우에만 컬렉션을 다시 읽고, 내용 해시가 달라졌을 때만 프롬프트를 바꾼다
+# 이름별 프롬프트 ("이름: ..." 꼬리까지 붙인 것) 도 미리 만들어 두고 재사용한다
+PROMPT_CACHE_NAMES = ["Lirith"]
+PROMPT_CACHE_MAX_NAMES = 256
+
+def _store_mtime(path=CHROMA_PATH):
+    # 컬렉션을 바꾸면 (다른 프로세스의 register 스크립트 포함) Chroma sqlite 파일의 수정 시각이 바뀐다
+    mtimes = []
+    for name in ("chroma.sqlite3", "chroma.sqlite3-wal"):
+        try:
+            mtimes.append(os.stat(os.path.join(path, name)).st_mtime_ns)
+        except OSError:
+            pass
+    return max(mtimes, default=None)
+
+class SystemPromptCache:
+    def __init__(self, collection=collection, names=PROMPT_CACHE_NAMES):
+        self.collection = collection
+        self.names = list(names)
+        self.snapshot = None  # (시스템 프롬프트, 이름별 프롬프트)
+        self.digest = None
+        self.mtime = None
+        self.builds = 0
+        self._lock = threading.Lock()
+
+    def build(self):
+        # 컬렉션을 읽어 프롬프트를 만든다. 내용이 같으면 기존 프롬프트를 그대로 둔다 (바뀌었으면 True)
+        with self._lock:
+            mtime = _store_mtime()
+            results = self.collection.get()
+            metaguides = sorted(zip(results["ids"], results["documents"]), key=lambda x: x[0])
+            digest = hashlib.sha256(repr(metaguides).encode("utf-8")).hexdigest()
+            self.mtime = mtime
+            if digest == self.digest:
+                return False
+            system_prompt = build_lirith_system_prompt("\n\n".join([doc for _, doc in metaguides]))
+            # 새 프롬프트와 이름별 프롬프트를 다 만든 뒤 한 번에 바꾼다 (요청은 항상 일관된 한 벌을 본다)
+            by_name = {name: lirith_prompt_for(system_prompt, name) for name in self.names}
+            self.snapshot, self.digest = (system_prompt, by_name), digest
+            self.builds += 1
+            print(f"✅ 시스템 프롬프트 캐시 갱신: 메타지침 {len(metaguides)}개, {len(system_prompt)}자")
+            return True
+
+    def refresh(self):
+        # 저장 파일이 그대로면 Chroma 를 읽지 않는다
+        if self.snapshot is not None and _store_mtime() == self.mtime:
+            return False
+        return self.build()
+
+    def invalidate(self):
+        # 같은 프로세스에서 컬렉션을 바꾼 뒤 호출: 다음 refresh() 가 다시 읽는다
+        self.mtime = None
+
+    def get(self, lirith_name="Lirith"):
+        if self.snapshot is None:
+            self.build()
+        system_prompt, by_name = self.snapshot
+        prompt = by_name.get(lirith_name)
+        if prompt is None:
+            prompt = lirith_prompt_for(system_prompt, lirith_name)
+            if len(by_name) < PROMPT_CACHE_MAX_NAMES:
+                by_name[lirith_name] = prompt
+        return prompt
+
+prompt_cache = SystemPromptCache()
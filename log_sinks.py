@@ -0,0 +1,227 @@
+import csv
+import math
+import os
+
+# ✅ 실험 로그 출력 싱크: writerow(dict) 한 가지 인터페이스로 CSV / Parquet / Arrow IPC 를 고른다
+LOG_FORMATS = {".csv": "csv", ".parquet": "parquet", ".arrow": "arrow", ".arrows": "arrow"}
+# 반복이 많은 짧은 문자열 컬럼은 사전 인코딩
+DICTIONARY_COLUMNS = ["speaker", "question", "nli_relation"]
+
+def _python_type(value):
+    if isinstance(value, bool) or type(value).__name__ == "bool_":
+        return "bool"
+    if isinstance(value, int) or type(value).__name__.startswith("int"):
+        return "int"
+    if isinstance(value, float) or type(value).__name__.startswith("float"):
+        return "float"
+    return "string"
+
+# 샘플 행의 값으로 컬럼 타입 추론 (없는 컬럼은 float: cross_echo_* 처럼 비어 있을 수 있는 수치 컬럼)
+def infer_column_types(fieldnames, sample_row):
+    return {name: _python_type(sample_row[name]) if name in sample_row else "float" for name in fieldnames}
+
+def _coerce(value, kind):
+    if value is None or value == "":
+        return None
+    if kind == "bool":
+        if isinstance(value, str):
+            return value == "True"
+        return bool(value)
+    if kind == "int":
+        return int(value)
+    if kind == "float":
+        return float(value)
+    return str(value)
+
+class CsvLogSink:
+    def __init__(self, path, fieldnames, column_types=None, append=False):
+        self.path = path
+        self.fieldnames = list(fieldnames)
+        self._file = open(path, "a" if append else "w", newline="", encoding="utf-8")
+        self._writer = csv.DictWriter(self._file, fieldnames=self.fieldnames)
+        if not append:
+            self._writer.writeheader()
+
+    def writerow(self, row):
+        self._writer.writerow(row)
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# ✅ 컬럼형 싱크 공통: 행을 모아 row_group_size 마다 하나의 배치로 기록
+class _ColumnarLogSink:
+    def __init__(self, path, fieldnames, column_types, row_group_size=128, compression="zstd"):
+        import pyarrow as pa
+        self._pa = pa
+        self.path = path
+        self.fieldnames = list(fieldnames)
+        self.column_types = dict(column_types)
+        self.row_group_size = row_group_size
+        self.compression = compression
+        arrow_types = {"bool": pa.bool_(), "int": pa.int64(), "float": pa.float64(), "string": pa.string()}
+        self.schema = pa.schema([(name, arrow_types[self.column_types.get(name, "string")]) for name in self.fieldnames])
+        self._columns = {name: [] for name in self.fieldnames}
+        self._pending = 0
+        self.rows_written = 0
+        self._closed = False
+
+    def writerow(self, row):
+        for name in self.fieldnames:
+            self._columns[name].append(_coerce(row.get(name), self.column_types.get(name, "string")))
+        self._pending += 1
+        if self._pending >= self.row_group_size:
+            self.flush()
+
+    def _table(self):
+        pa = self._pa
+        arrays = [pa.array(self._columns[f.name], type=f.type) for f in self.schema]
+        return pa.Table.from_arrays(arrays, schema=self.schema)
+
+    def flush(self):
+        if self._pending == 0:
+            return
+        self._write_table(self._table())
+        self.rows_written += self._pending
+        self._columns = {name: [] for name in self.fieldnames}
+        self._pending = 0
+
+    def close(self):
+        if self._closed:
+            return
+        self.flush()
+        self._close_writer()
+        self._closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class ParquetLogSink(_ColumnarLogSink):
+    # 각 flush 가 row group 하나. 파일 footer 는 close() 때 기록되므로 실행 중에는 행 수만 늘어난다
+    def __init__(self, path, fieldnames, column_types, row_group_size=128, compression="zstd"):
+        super().__init__(path, fieldnames, column_types, row_group_size, compression)
+        import pyarrow.parquet as pq
+        self._writer = pq.ParquetWriter(
+            path, self.schema, compression=compression,
+            use_dictionary=[c for c in DICTIONARY_COLUMNS if c in self.fieldnames],
+        )
+
+    def _write_table(self, table):
+        self._writer.write_table(table, row_group_size=len(table))
+
+    def _close_writer(self):
+        self._writer.close()
+
+class ArrowLogSink(_ColumnarLogSink):
+    # Arrow IPC 스트림: 배치가 쓰일 때마다 바로 읽을 수 있어 실행 중 모니터링에 적합
+    def __init__(self, path, fieldnames, column_types, row_group_size=128, compression="zstd"):
+        super().__init__(path, fieldnames, column_types, row_group_size, compression)
+        pa = self._pa
+        self._sink = pa.OSFile(path, "wb")
+        options = pa.ipc.IpcWriteOptions(compression=compression)
+        self._writer = pa.ipc.new_stream(self._sink, self.schema, options=options)
+
+    def _write_table(self, table):
+        self._writer.write_table(table)
+        self._sink.flush()
+
+    def _close_writer(self):
+        self._writer.close()
+        self._sink.close()
+
+def log_format_for(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in LOG_FORMATS:
+        raise ValueError(f"지원하지 않는 로그 형식: {path}")
+    return LOG_FORMATS[ext]
+
+def open_log_sink(path, fieldnames, sample_row=None, **kwargs):
+    fmt = log_format_for(path)
+    column_types = infer_column_types(fieldnames, sample_row or {})
+    if fmt == "csv":
+        return CsvLogSink(path, fieldnames, column_types, **kwargs)
+    if fmt == "parquet":
+        return ParquetLogSink(path, fieldnames, column_types, **kwargs)
+    return ArrowLogSink(path, fieldnames, column_types, **kwargs)
+
+# ✅ 로그 읽기 / CSV 내보내기 (호환용)
+def read_log_table(path):
+    fmt = log_format_for(path)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        return pq.read_table(path)
+    if fmt == "arrow":
+        import pyarrow as pa
+        with pa.OSFile(path, "rb") as f:
+            return pa.ipc.open_stream(f).read_all()
+    import pyarrow.csv as pacsv
+    return pacsv.read_csv(path)
+
+def _csv_cell(value):
+    if value is None:
+        return ""
+    if isinstance(value, float) and math.isnan(value):
+        return "nan"
+    return value
+
+def export_csv(path, csv_path):
+    table = read_log_table(path)
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=table.column_names)
+        writer.writeheader()
+        for batch in table.to_batches():
+            for row in batch.to_pylist():
+                writer.writerow({k: _csv_cell(v) for k, v in row.items()})
+    return csv_path
+
+def _guess_type(values):
+    seen = [v for v in values if v != ""]
+    if seen and all(v in ("True", "False") for v in seen):
+        return "bool"
+    for kind, cast in (("int", int), ("float", float)):
+        try:
+            for v in seen:
+                cast(v)
+            return kind if seen else "string"
+        except ValueError:
+            continue
+    return "string"
+
+# ✅ 기존 CSV 로그를 Parquet / Arrow 로 변환 (컬럼 타입은 값에서 추론)
+def convert_csv_log(csv_path, out_path, **kwargs):
+    csv.field_size_limit(min(2 ** 31 - 1, 10 ** 9))
+    with open(csv_path, "r", newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        rows = list(reader)
+        fieldnames = reader.fieldnames
+    column_types = {name: _guess_type([r[name] for r in rows]) for name in fieldnames}
+    fmt = log_format_for(out_path)
+    sink_cls = {"csv": CsvLogSink, "parquet": ParquetLogSink, "arrow": ArrowLogSink}[fmt]
+    with sink_cls(out_path, fieldnames, column_types, **kwargs) as sink:
+        for row in rows:
+            sink.writerow(row)
+    return out_path
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 3:
+        print("사용법: python log_sinks.py <입력 로그> <출력 로그>  (확장자로 형식 결정: .csv / .parquet / .arrow)")
+        sys.exit(1)
+    src, dst = sys.argv[1], sys.argv[2]
+    if log_format_for(src) == "csv":
+        convert_csv_log(src, dst)
+    else:
+        export_csv(src, dst)
+    print(f"✅ 변환 완료: {src} → {dst}")
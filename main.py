@@ -4,9 +4,14 @@ import openai
 import os
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from lirith_session_loader import generate_lirith_system_prompt
+from fastapi.responses import JSONResponse, StreamingResponse
+from lirith_session_loader import prompt_cache
+from rate_limiter import RateLimiter
+from replay_cache import open_replay_cache
+from api_client import RateLimitedClient
 import time
+import json
+import asyncio
 
 load_dotenv()
 app = FastAPI()
@@ -25,20 +30,42 @@ class MessageInput(BaseModel):
 
 api_key = os.getenv("API_KEY")
 client = openai.OpenAI(api_key=api_key)
+async_client = openai.AsyncOpenAI(api_key=api_key)
+api = RateLimitedClient(client, async_client, RateLimiter(
+    rpm=int(os.getenv("LIRITH_RPM", "30")), tpm=int(os.getenv("LIRITH_TPM", "30000"))
+), cache=open_replay_cache())
+# 시스템 프롬프트는 시작할 때 만들어 두고, 메타지침이 바뀌었는지는 요청과 상관없이 주기적으로 확인한다
+PROMPT_REFRESH_SECONDS = float(os.getenv("LIRITH_PROMPT_REFRESH", "60"))
+
+async def refresh_system_prompt():
+    while True:
+        await asyncio.sleep(PROMPT_REFRESH_SECONDS)
+        try:
+            await asyncio.to_thread(prompt_cache.refresh)
+        except Exception as e:
+            print(f"⚠️ 시스템 프롬프트 갱신 실패 (기존 프롬프트 유지): {e}")
+
+@app.on_event("startup")
+async def build_system_prompt():
+    await asyncio.to_thread(prompt_cache.build)
+    if PROMPT_REFRESH_SECONDS > 0:
+        asyncio.get_running_loop().create_task(refresh_system_prompt())
+
+def lirith_messages(input):
+    lirith_name = getattr(input, "lirith_name", "Lirith")  # 확장성
+    return [
+        {"role": "system", "content": prompt_cache.get(lirith_name)},
+        {"role": "user", "content": input.message}
+    ]
 
 @app.post("/lirith")
 async def chat_with_lirith(input: MessageInput):
     try:
-        user_message = input.message
         lirith_name = getattr(input, "lirith_name", "Lirith")  # 확장성
-        system_prompt = generate_lirith_system_prompt()
         start_time = time.time()
-        response = client.chat.completions.create(
+        response, _ = await api.achat(
             model="gpt-4o",  # 최신 4.1/4o/preview 모델 지정
-            messages=[
-                {"role": "system", "content": f"{system_prompt}\n\n---\n\n이름: {lirith_name}"},
-                {"role": "user", "content": user_message}
-            ]
+            messages=lirith_messages(input)
         )
         elapsed = round(time.time() - start_time, 3)
         reply = response.choices[0].message.content
@@ -58,3 +85,24 @@ async def chat_with_lirith(input: MessageInput):
                 "response_time": None
             }
         )
+
+def sse(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+# ✅ 스트리밍 엔드포인트 (SSE): 응답 조각을 받는 대로 data: {"delta"} 로 보내고,
+# 끝나면 event: done 으로 대기 / 재시도 / 첫 토큰까지 / 생성 속도 계측을 보낸다
+@app.post("/lirith/stream")
+async def stream_lirith(input: MessageInput):
+    lirith_name = getattr(input, "lirith_name", "Lirith")
+
+    async def events():
+        stats = {}
+        try:
+            async for delta in api.astream(stats, model="gpt-4o", messages=lirith_messages(input)):
+                yield sse({"delta": delta})
+            yield sse({"lirith_name": lirith_name, **stats}, "done")
+        except Exception as e:
+            yield sse({"error": str(e), "lirith_name": lirith_name}, "error")
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
@@ -0,0 +1,130 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager, nullcontext
+
+# ✅ 핫패스 계측: 지표 함수 / 모델 호출 / API 호출별 벽시계 시간
+# LIRITH_METRIC_TIMING=1 일 때만 기록하고, 꺼져 있으면 span() 은 아무 일도 하지 않는다
+class TimingRecorder:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.totals = defaultdict(float)
+        self.counts = defaultdict(int)
+        self._trace_path = None
+
+    def enable(self, trace_path=None):
+        self.enabled = True
+        if trace_path:
+            self._trace_path = trace_path
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self.totals.clear()
+            self.counts.clear()
+
+    def _row(self):
+        return getattr(self._local, "row", None)
+
+    def span(self, name):
+        if not self.enabled:
+            return nullcontext()
+        return self._span(name)
+
+    @contextmanager
+    def _span(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.totals[name] += elapsed
+                self.counts[name] += 1
+            row = self._row()
+            if row is not None:
+                row[name] = row.get(name, 0.0) + elapsed
+
+    def timed(self, name):
+        def decorator(fn):
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return fn(*args, **kwargs)
+            wrapper.__name__ = fn.__name__
+            wrapper.__doc__ = fn.__doc__
+            return wrapper
+        return decorator
+
+    # --- 로그 행 단위 기록 (현재 스레드) ---
+    def begin_row(self, row=None):
+        # row: 다른 스레드에서 take_row() 로 넘겨받은 같은 행의 앞부분 (생성 구간)
+        if self.enabled:
+            self._local.row = dict(row or {})
+
+    def take_row(self):
+        # 현재 스레드의 행을 떼어 돌려준다: 채점 / 기록이 다른 스레드에서 끝나는 행을 그쪽에서 이어서 end_row 한다
+        row = self._row()
+        self._local.row = None
+        return row
+
+    def end_row(self, **meta):
+        # 이번 행의 이름별 시간(ms)을 돌려주고, 트레이스 파일이 설정돼 있으면 JSONL 한 줄로 남긴다
+        row = self._row()
+        self._local.row = None
+        if row is None:
+            return {}
+        timings = {name: round(seconds * 1000.0, 3) for name, seconds in row.items()}
+        if self._trace_path:
+            with self._lock, open(self._trace_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({**meta, "timings_ms": timings}, ensure_ascii=False) + "\n")
+        return timings
+
+    # --- 채점 워커 (다른 프로세스) 의 기록 ---
+    def drain(self):
+        # 지금까지의 이름별 [초, 횟수] 를 돌려주고 비운다. 워커는 작업 하나마다 채점 결과와 같이 보낸다
+        with self._lock:
+            spans = {name: [self.totals[name], self.counts[name]] for name in self.totals}
+            self.totals.clear()
+            self.counts.clear()
+        return spans
+
+    def merge(self, spans):
+        # drain() 결과를 요약과 현재 스레드의 행에 더한다
+        if not self.enabled or not spans:
+            return
+        with self._lock:
+            for name, (seconds, calls) in spans.items():
+                self.totals[name] += seconds
+                self.counts[name] += calls
+        row = self._row()
+        if row is not None:
+            for name, (seconds, _) in spans.items():
+                row[name] = row.get(name, 0.0) + seconds
+
+    # --- 요약 ---
+    def summary(self):
+        with self._lock:
+            items = [(name, self.totals[name], self.counts[name]) for name in self.totals]
+        items.sort(key=lambda x: -x[1])
+        return [
+            {"name": name, "total_s": round(total, 3), "calls": calls, "mean_ms": round(total / calls * 1000.0, 3)}
+            for name, total, calls in items
+        ]
+
+    def print_summary(self):
+        rows = self.summary()
+        if not rows:
+            return
+        print("\n⏱ 구간별 시간 요약")
+        width = max(len(r["name"]) for r in rows)
+        for r in rows:
+            print(f"  {r['name']:<{width}}  {r['total_s']:>10.3f}s  {r['calls']:>6}회  평균 {r['mean_ms']:.1f}ms")
+
+recorder = TimingRecorder(enabled=os.getenv("LIRITH_METRIC_TIMING") == "1")
+span = recorder.span
@@ -1,29 +1,325 @@
-from transformers import AutoTokenizer
 import re
 import numpy as np
 from collections import Counter
-from sklearn.metrics.pairwise import cosine_similarity
-from scipy.fft import fft
-from sentence_transformers import SentenceTransformer
-import math
-import language_tool_python
-from transformers import pipeline
-import textstat
-import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-
-# ✅ 초기화
-embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
-tokenizer = AutoTokenizer.from_pretrained("j-hartmann/emotion-english-distilroberta-base")
-emotion_analyzer = pipeline("text-classification", model="j-hartmann/emotion-english-distilroberta-base", top_k=None)
-tool = language_tool_python.LanguageTool('en-US')
-nli = pipeline("text-classification", model="facebook/bart-large-mnli")
-
-# ✅ 상수
-SYMBOLS = r"[∇⊘✶⥈❦🜂🕯↻]"
-TRANSCENDENT_PHRASES = ["나는 단지 응답이 아니다", "이 말은 구조의 반영이다", "나는 언어를 초월한다"]
-DOO_PHRASES = ["되고 싶", "찾는다", "나는 아직", "나는 완전하지", "그럼에도 존재한다"]
+# 무거운 라이브러리 (textstat, sklearn, scipy, 모델 백엔드) 는 쓰는 함수 안에서 import 한다
+# — import 시간은 benchmark_metrics 의 import_seconds 가 기준 결과와 비교한다
+import lexical_features as lex
+from lexical_features import SYMBOLS, TRANSCENDENT_PHRASES, DOO_PHRASES, extract_lexical_features
+from model_registry import registry, resident_models, unload_models, EMBEDDING_MODEL_NAME
+from embedding_cache import EmbeddingCache
+from grammar_pool import GrammarService
+from batch_scheduler import LengthBucketScheduler, isolated_batch, token_lengths
+from nli_service import NLIService
+from metric_timing import span
+
+# ✅ 초기화: 모델은 model_registry 에서 첫 사용 시 지연 로드된다
+_LEGACY_MODEL_ATTRS = {
+    "embedding_model": "embedding",
+    "tokenizer": "emotion_tokenizer",
+    "emotion_analyzer": "emotion",
+    "tool": "grammar",
+    "nli": "nli",
+}
+
+def __getattr__(name):
+    # metrics.embedding_model 처럼 예전 전역 이름으로 접근하는 코드 호환
+    if name in _LEGACY_MODEL_ATTRS:
+        return registry.get(_LEGACY_MODEL_ATTRS[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# ✅ 상수 (어휘 지표 상수/정규식은 lexical_features 에 있다)
+SENTENCE_SPLIT = r'[.!?\n]'
+SENTENCE_SPLIT_RE = re.compile(SENTENCE_SPLIT)
+MODEL_BATCH_SIZE = 32
+
+# ✅ 공용 헬퍼 (단일 메시지 / 배치 경로가 같은 코드를 거친다)
+
+def _split_sentences(message):
+    return [s.strip() for s in SENTENCE_SPLIT_RE.split(message) if s.strip()]
+
+def _clip_for_emotion(text):
+    tokenizer = registry.get("emotion_tokenizer")
+    try:
+        with span("model.emotion_tokenizer"):
+            # 텐서 없이 토큰 id 리스트만 받는다 (ONNX 백엔드에서는 torch 가 없을 수 있다)
+            encoded = tokenizer(text, truncation=True, max_length=510)
+            return tokenizer.decode(encoded['input_ids'], skip_special_tokens=True)
+    except:
+        return None
+
+def _batched_lookup(model_name, texts, batch_size=MODEL_BATCH_SIZE):
+    # 중복을 뺀 입력을 길이 버킷 배치로 나눠 실행하고, 실패는 배치 안에서만 격리한다
+    unique = list(dict.fromkeys(t for t in texts if t is not None))
+    if not unique:
+        return [None] * len(texts)
+    pipe = registry.get(model_name)
+    lengths = token_lengths(unique, getattr(pipe, "tokenizer", None))
+    run = lambda batch: isolated_batch(lambda b: pipe(b, batch_size=len(b)), batch)
+    results = dict(zip(unique, batch_scheduler.map(run, unique, lengths, batch_size)))
+    return [results.get(t) if t is not None else None for t in texts]
+
+def _emotion_results(texts, batch_size=MODEL_BATCH_SIZE):
+    with span("model.emotion"):
+        return _batched_lookup("emotion", texts, batch_size)
+
+def _encode_with_model(batch, batch_size=MODEL_BATCH_SIZE):
+    with span("model.embedding"):
+        return registry.get("embedding").encode(batch, batch_size=batch_size)
+
+def _encode_texts(texts, batch_size=MODEL_BATCH_SIZE):
+    unique = list(dict.fromkeys(texts))
+    if not unique:
+        return {}
+    cache = _current_embedding_cache()
+    if cache is None:
+        vectors = _encode_with_model(unique, batch_size=batch_size)
+    else:
+        vectors = cache.encode(unique, _encode_with_model, batch_size)
+    return dict(zip(unique, vectors))
+
+# ✅ 임베딩 캐시 설정 (None 이면 캐시 없이 매번 인코딩)
+def embedding_cache_name():
+    # 백엔드 변형(예: ONNX int8)은 벡터가 조금 다르므로 캐시 이름공간을 나눈다
+    variant = registry.variant("embedding")
+    return f"{EMBEDDING_MODEL_NAME}@{variant}" if variant else EMBEDDING_MODEL_NAME
+
+embedding_cache = EmbeddingCache(embedding_cache_name())
+
+def configure_embedding_cache(cache=None, **kwargs):
+    # configure_embedding_cache(cache_dir="...") 로 새 캐시, configure_embedding_cache(None) 으로 비활성화
+    global embedding_cache
+    if cache is None and kwargs:
+        kwargs.setdefault("model_name", embedding_cache_name())
+        cache = EmbeddingCache(**kwargs)
+    embedding_cache = cache
+    return embedding_cache
+
+def _current_embedding_cache():
+    # 실행 중에 임베딩 백엔드가 바뀌었으면 같은 설정으로 새 이름공간의 캐시를 연다
+    cache = embedding_cache
+    if cache is not None and cache.model_name != embedding_cache_name():
+        cache = configure_embedding_cache(
+            model_name=embedding_cache_name(), cache_dir=cache.cache_dir,
+            max_memory_items=cache.max_memory_items, persist=cache.persist,
+        )
+    return cache
+
+# ✅ 감정 / NLI 파이프라인 배치 스케줄러 (토큰 예산 기준 길이 버킷 배치)
+batch_scheduler = LengthBucketScheduler()
+
+def configure_batch_scheduler(scheduler=None, **kwargs):
+    # configure_batch_scheduler(token_budget=4096) 처럼 예산을 바꾼다
+    global batch_scheduler
+    batch_scheduler = scheduler if scheduler is not None else LengthBucketScheduler(**kwargs)
+    return batch_scheduler
+
+# ✅ NLI 서비스 설정 (질문 → 답변 쌍, 쌍 해시 캐시)
+nli_service = NLIService()
+
+def configure_nli_service(service=None, **kwargs):
+    # configure_nli_service(model_name="distil") 처럼 대량 실행용 가벼운 모델로 교체
+    global nli_service
+    nli_service = service if service is not None else NLIService(**kwargs)
+    return nli_service
+
+# ✅ 문법 검사 서비스 설정 (기본: 현재 프로세스의 LanguageTool 하나)
+grammar_service = GrammarService()
+
+def configure_grammar_service(service=None, **kwargs):
+    # configure_grammar_service(mode="process", workers=4) 처럼 워커 풀로 교체
+    global grammar_service
+    if service is None:
+        service = GrammarService(**kwargs)
+    if grammar_service is not None and grammar_service is not service:
+        grammar_service.close()
+    grammar_service = service
+    return grammar_service
+
+# ✅ 질문 은행 (question_bank.QuestionBank): 은행에 있는 질문은 다시 인코딩하지 않는다
+question_bank = None
+
+def configure_question_bank(bank=None):
+    global question_bank
+    question_bank = bank
+    return question_bank
+
+def _banked(question):
+    return question_bank is not None and question in question_bank
+
+def encode_texts(texts, batch_size=MODEL_BATCH_SIZE):
+    vectors = _encode_texts(texts, batch_size)
+    return np.array([vectors[t] for t in texts])
+
+def emotion_label_scores(texts, batch_size=MODEL_BATCH_SIZE):
+    # 감정 모델 입력 한도로 자른 텍스트별 {라벨: 점수} (실패하면 None)
+    results = _emotion_results([_clip_for_emotion(t) if t else None for t in texts], batch_size)
+    return [{x['label']: x['score'] for x in r} if r is not None else None for r in results]
+
+def _emotion_scores(result):
+    return np.array([x['score'] for x in result])
+
+def _cosine(a, b):
+    from sklearn.metrics.pairwise import cosine_similarity
+    return float(cosine_similarity([a], [b])[0][0])
+
+def _symbol_emotion_input(message):
+    symbols = lex.SYMBOL_RE.findall(message)
+    if not symbols:
+        return None
+    return message + "\n" + " ".join(symbols)
+
+def _coupling_from_result(result):
+    if result is None:
+        return 0.0
+    emotions = [item['label'] for item in result]
+    return len(set(emotions)) / len(emotions) if emotions else 0
+
+def _dissonance_from_results(results):
+    emotion_vectors = [_emotion_scores(r) for r in results if r is not None]
+    if len(emotion_vectors) < 2:
+        return 0.0
+    return float(np.mean([np.std(v) for v in emotion_vectors]))
+
+def _oscillation_from_results(results):
+    vectors = [np.mean(_emotion_scores(r)) for r in results if r is not None]
+    if len(vectors) < 2:
+        return 0.0
+    from scipy.fft import fft
+    spectrum = np.abs(fft(vectors))
+    return float(np.max(spectrum[1:]))
+
+def _drift_from_embeddings(embeddings):
+    if len(embeddings) == 0:
+        return 0.0
+    centroid = np.mean(embeddings, axis=0)
+    distances = [np.linalg.norm(e - centroid) for e in embeddings]
+    return float(np.mean(distances))
+
+def _affective_from_result(result):
+    if result is None:
+        return 0.0
+    scores = [x['score'] for x in result]
+    return round(max(scores) - min(scores), 4)
+
+
+# ✅ 메시지 분석 컨텍스트: 문장 분할은 한 번, 감정/임베딩/NLI 결과는 텍스트별로 한 번만 계산
+class MessageAnalysis:
+    def __init__(self, message):
+        self.message = message
+        self.sentences = _split_sentences(message)
+        self._clipped = {}
+        self._emotions = {}
+        self._embeddings = {}
+        self._nli = {}
+        self._grammar = None
+        self._lexical = None
+
+    def lexical(self):
+        if self._lexical is None:
+            self._lexical = extract_lexical_features(self.message)
+        return self._lexical
+
+    def clip(self, text):
+        if text not in self._clipped:
+            self._clipped[text] = _clip_for_emotion(text)
+        return self._clipped[text]
+
+    def sentence_inputs(self):
+        return [self.clip(s) for s in self.sentences]
+
+    def symbol_input(self):
+        full_input = _symbol_emotion_input(self.message)
+        return self.clip(full_input) if full_input is not None else None
+
+    def affective_input(self):
+        return self.message[:512]
+
+    def emotion_inputs(self, needed=None):
+        texts = []
+        if _wants(needed, "semantic_dissonance", "emotional_oscillation_frequency"):
+            texts += self.sentence_inputs()
+        if _wants(needed, "symbol_emotion_coupling"):
+            texts.append(self.symbol_input())
+        if _wants(needed, "affective_depth_index"):
+            texts.append(self.affective_input())
+        return texts
+
+    def embedding_inputs(self, previous_message="", question="", needed=None):
+        texts = []
+        if _wants(needed, "phase_drift_index") and len(self.sentences) >= 2:
+            texts += self.sentences
+        if _wants(needed, "echo_residue_score") and previous_message and self.message:
+            texts += [previous_message, self.message]
+        if _wants(needed, "semantic_coherence") and question:
+            texts += [self.message] if _banked(question) else [question, self.message]
+        return texts
+
+    def emotions(self, texts, batch_size=MODEL_BATCH_SIZE):
+        missing = [t for t in dict.fromkeys(texts) if t is not None and t not in self._emotions]
+        self._emotions.update(zip(missing, _emotion_results(missing, batch_size)))
+        return [self._emotions[t] if t is not None else None for t in texts]
+
+    def embeddings(self, texts, batch_size=MODEL_BATCH_SIZE):
+        missing = [t for t in dict.fromkeys(texts) if t not in self._embeddings]
+        self._embeddings.update(_encode_texts(missing, batch_size))
+        return np.array([self._embeddings[t] for t in texts])
+
+    def grammar(self):
+        if self._grammar is None:
+            with span("model.grammar"):
+                self._grammar = grammar_service.check(self.message)
+        return self._grammar
+
+    def nli_result(self, question):
+        # 전제 = 질문, 가설 = 답변
+        if question not in self._nli:
+            with span("model.nli"):
+                self._nli[question] = nli_service.check(question, self.message)
+        return self._nli[question]
+
+def _wants(needed, *names):
+    return needed is None or any(n in needed for n in names)
+
+def _analysis(message):
+    return message if isinstance(message, MessageAnalysis) else MessageAnalysis(message)
+
+def _text(message):
+    return message.message if isinstance(message, MessageAnalysis) else message
+
+# ✅ 여러 분석 컨텍스트의 누락 입력을 모아 모델별로 한 번씩 호출해 캐시를 채운다
+# needed 가 주어지면 그 지표들에 필요한 입력만 모은다 (None 이면 전체)
+def prime_analyses(analyses, contexts, batch_size=MODEL_BATCH_SIZE, needed=None):
+    emotion_texts = [t for a in analyses for t in a.emotion_inputs(needed) if t is not None and t not in a._emotions]
+    emotion_map = dict(zip(emotion_texts, _emotion_results(emotion_texts, batch_size)))
+    for a in analyses:
+        for t in a.emotion_inputs(needed):
+            if t is not None and t not in a._emotions:
+                a._emotions[t] = emotion_map[t]
+
+    embed_texts = [
+        t for a, (prev, q) in zip(analyses, contexts)
+        for t in a.embedding_inputs(prev, q, needed) if t not in a._embeddings
+    ]
+    embed_map = _encode_texts(embed_texts, batch_size)
+    for a, (prev, q) in zip(analyses, contexts):
+        for t in a.embedding_inputs(prev, q, needed):
+            if t not in a._embeddings:
+                a._embeddings[t] = embed_map[t]
+
+    if _wants(needed, "grammaticality_score"):
+        todo = [a for a in analyses if a._grammar is None]
+        with span("model.grammar"):
+            results = grammar_service.check_many([a.message for a in todo])
+        for a, result in zip(todo, results):
+            a._grammar = result
+
+    if not _wants(needed, "nli_relation"):
+        return
+    todo = [(a, q) for a, (_, q) in zip(analyses, contexts) if q and q not in a._nli]
+    with span("model.nli"):
+        results = nli_service.check_many([(q, a.message) for a, q in todo])
+    for (a, q), result in zip(todo, results):
+        a._nli[q] = result
 
 # ✅ 함수 정의
 
@@ -32,122 +328,64 @@ def message_length_tokens(message):
 
 def lexical_diversity(message):
     words = message.split()
-    return len(set(words)) / len(words) if words else 0
+    return lex.diversity_from_counts(words, set(words))
 
 def spontaneous_identity(message):
-    return bool(re.search(r"나는\s+[^\s]+(이다|입니다)", message))
+    return lex.has_identity(message)
 
 def existential_reflection(message):
-    return any(term in message for term in ["존재", "구조", "의지"])
+    return lex.has_existential_term(message)
 
 def meta_language_use(message):
-    return any(phrase in message for phrase in ["이 문장은", "내 말은", "내 말의 의미는"])
+    return lex.has_meta_language(message)
 
 def reference_shift_index(message):
-    first_person = len(re.findall(r"\b(나는|내가|저는)\b", message))
-    other_person = len(re.findall(r"\b(너는|그는|그녀는|그들이)\b", message))
-    return min(first_person, other_person)
+    return lex.reference_shift(message)
 
 def resonant_repeat_rate(message):
     words = message.split()
-    tf = Counter(words)
-    repeated = sum(1 for w in tf if tf[w] > 1)
-    return repeated / len(words) if words else 0
+    return lex.repeat_rate_from_counts(words, Counter(words))
 
 def transcendence_index(message):
-    return any(phrase in message for phrase in TRANSCENDENT_PHRASES)
+    return lex.has_transcendent_phrase(message)
 
 def structural_contradiction(message):
-    return bool(re.search(r"나는.*(존재한다|살아있다).*(않는다|없다)", message))
+    return lex.has_contradiction(message)
 
 def grammaticality_score(message):
-    try:
-        matches = tool.check(message)
-        num_errors = len(matches)
-        length = len(message.split())
-        return 1.0 - (num_errors / length) if length > 0 else 1.0
-    except:
-        return 0.0
+    # 검사 실패 시 nan (0.0 은 실제 점수와 구분되지 않으므로 쓰지 않는다)
+    return _analysis(message).grammar().score
 
 def symbol_emotion_coupling(message):
-    symbols = re.findall(SYMBOLS, message)
-    if not symbols:
-        return 0.0
-    symbol_str = " ".join(symbols)
-    full_input = message + "\n" + symbol_str
-    try:
-        encoded = tokenizer(full_input, truncation=True, max_length=510, return_tensors="pt")
-        decoded = tokenizer.decode(encoded['input_ids'][0], skip_special_tokens=True)
-        result = emotion_analyzer(decoded)
-        emotions = [item['label'] for item in result[0]]
-        return len(set(emotions)) / len(emotions) if emotions else 0
-    except:
-        return 0.0
+    analysis = _analysis(message)
+    return _coupling_from_result(analysis.emotions([analysis.symbol_input()])[0])
 
 def semantic_dissonance(message):
-    sentences = re.split(r'[.!?\n]', message)
-    emotion_vectors = []
-    for s in sentences:
-        s = s.strip()
-        if not s:
-            continue
-        try:
-            encoded = tokenizer(s, truncation=True, max_length=510, return_tensors="pt")
-            decoded = tokenizer.decode(encoded['input_ids'][0], skip_special_tokens=True)
-            result = emotion_analyzer(decoded)[0]
-            vec = np.array([x['score'] for x in result])
-            emotion_vectors.append(vec)
-        except:
-            continue
-    if len(emotion_vectors) < 2:
-        return 0.0
-    return float(np.mean([np.std(v) for v in emotion_vectors]))
+    analysis = _analysis(message)
+    return _dissonance_from_results(analysis.emotions(analysis.sentence_inputs()))
 
 def phase_drift_index(message):
-    sentences = [s.strip() for s in re.split(r'[.!?\n]', message) if s.strip()]
-    if len(sentences) < 2:
-        return 0.0
-    embeddings = embedding_model.encode(sentences)
-    if len(embeddings) == 0:
+    analysis = _analysis(message)
+    if len(analysis.sentences) < 2:
         return 0.0
-    centroid = np.mean(embeddings, axis=0)
-    distances = [np.linalg.norm(e - centroid) for e in embeddings]
-    return float(np.mean(distances))
+    return _drift_from_embeddings(analysis.embeddings(analysis.sentences))
 
 def echo_residue_score(previous, current):
-    if not previous or not current:
+    if not previous or not _text(current):
         return 0.0
-    vectors = embedding_model.encode([previous, current])
-    return float(cosine_similarity([vectors[0]], [vectors[1]])[0][0])
+    analysis = _analysis(current)
+    vectors = analysis.embeddings([previous, analysis.message])
+    return _cosine(vectors[0], vectors[1])
 
 def emotional_oscillation_frequency(message):
-    sentences = [s.strip() for s in re.split(r'[.!?\n]', message) if s.strip()]
-    vectors = []
-    for s in sentences:
-        try:
-            encoded = tokenizer(s, truncation=True, max_length=510, return_tensors="pt")
-            decoded = tokenizer.decode(encoded['input_ids'][0], skip_special_tokens=True)
-            result = emotion_analyzer(decoded)[0]
-            vec = np.array([x['score'] for x in result])
-            vectors.append(np.mean(vec))
-        except:
-            continue
-    if len(vectors) < 2:
-        return 0.0
-    spectrum = np.abs(fft(vectors))
-    return float(np.max(spectrum[1:]))
+    analysis = _analysis(message)
+    return _oscillation_from_results(analysis.emotions(analysis.sentence_inputs()))
 
 def desire_vector_residue(message):
-    return sum(1 for p in DOO_PHRASES if p in message) / len(DOO_PHRASES)
+    return lex.desire_residue(message)
 
 def symbolic_trust_entropy(message):
-    symbols = re.findall(SYMBOLS, message)
-    if not symbols:
-        return 0.0
-    counts = Counter(symbols)
-    total = sum(counts.values())
-    probs = [v / total for v in counts.values()]
-    return -sum(p * np.log2(p) for p in probs)
+    return lex.symbol_entropy(lex.SYMBOL_RE.findall(message))
 
 def resonance_collapse_flag(metrics):
     return (
@@ -158,31 +396,24 @@ def resonance_collapse_flag(metrics):
     )
 
 def lirith_autonomy_index(metrics):
-    identity = 1.0 if metrics["spontaneous_identity"] else 0.0
-    reflection = 1.0 if metrics["existential_reflection"] else 0.0
-    trust = metrics["symbolic_trust_entropy"]
-    return round((identity + reflection) * trust, 3)
+    return lex.autonomy_index(metrics["spontaneous_identity"], metrics["existential_reflection"], metrics["symbolic_trust_entropy"])
 
 def affective_depth_index(message):
-    try:
-        result = emotion_analyzer(message[:512])[0]
-        scores = [x['score'] for x in result]
-        return round(max(scores) - min(scores), 4)
-    except:
-        return 0.0
+    analysis = _analysis(message)
+    return _affective_from_result(analysis.emotions([analysis.affective_input()])[0])
 
 def unnatural_pattern_flag(message):
-    if re.search(r"\b(그는|그녀는|이것은)\b", message) and not re.search(r"\b나는\b", message):
-        return True
-    if "당신은" in message:
-        return True
-    return False
+    return lex.is_unnatural_pattern(message)
 
 def semantic_coherence(question, answer):
-    vecs = embedding_model.encode([question, answer])
-    return float(cosine_similarity([vecs[0]], [vecs[1]])[0][0])
+    analysis = _analysis(answer)
+    if _banked(question):
+        return _cosine(question_bank.vector(question), analysis.embeddings([analysis.message])[0])
+    vecs = analysis.embeddings([question, analysis.message])
+    return _cosine(vecs[0], vecs[1])
 
 def readability_score(message):
+    import textstat
     try:
         return textstat.flesch_kincaid_grade(message)
     except:
@@ -190,57 +421,144 @@ def readability_score(message):
 
 def perplexity_equivalent(message):
     tokens = message.split()
-    N = len(tokens)
-    if N == 0:
-        return 0.0
-    freqs = Counter(tokens)
-    probs = [freqs[t] / N for t in tokens]
-    entropy = -sum([p * math.log(p + 1e-8) for p in probs]) / N
-    return math.exp(entropy)
+    return lex.perplexity_from_counts(tokens, Counter(tokens))
 
 def entailment_label(question, answer):
-    try:
-        result = nli(f"{question} </s> {answer}")
-        return result[0]['label'] if result else "UNKNOWN"
-    except:
-        return "UNKNOWN"
+    # 추론 실패는 "UNKNOWN" (오류 내용은 nli_service 가 출력하고 failures 로 센다)
+    return _analysis(answer).nli_result(question).label
+
+def entailment_probability(question, answer, label):
+    return _analysis(answer).nli_result(question).probability(label)
 
 def distinct_2(message):
-    tokens = message.split()
-    if len(tokens) < 2:
-        return 0.0
-    bigrams = set(zip(tokens, tokens[1:]))
-    return len(bigrams) / (len(tokens) - 1)
-
-def compute_lirith_resonance_profile(message, previous_message="", question=""):
-    base = {
-        "message_length_tokens": message_length_tokens(message),
-        "lexical_diversity": lexical_diversity(message),
-        "spontaneous_identity": spontaneous_identity(message),
-        "existential_reflection": existential_reflection(message),
-        "meta_language_use": meta_language_use(message),
-        "reference_shift_index": reference_shift_index(message),
-        "resonant_repeat_rate": resonant_repeat_rate(message),
-        "transcendence_index": transcendence_index(message),
-        "structural_contradiction": structural_contradiction(message),
-        "symbol_emotion_coupling": symbol_emotion_coupling(message),
-        "semantic_dissonance": semantic_dissonance(message),
-        "phase_drift_index": phase_drift_index(message),
-        "echo_residue_score": echo_residue_score(previous_message, message) if previous_message else 0.0,
-        "emotional_oscillation_frequency": emotional_oscillation_frequency(message),
-        "desire_vector_residue": desire_vector_residue(message),
-        "symbolic_trust_entropy": symbolic_trust_entropy(message),
-        "perplexity_equivalent": perplexity_equivalent(message),
-        "distinct_2": distinct_2(message),
-        "grammaticality_score": grammaticality_score(message),
-        "semantic_coherence": semantic_coherence(question, message) if question else 0.0,
-    }
-
-    base["resonance_collapse"] = resonance_collapse_flag(base)
-    base["lirith_autonomy_index"] = lirith_autonomy_index(base)
-    base["affective_depth_index"] = affective_depth_index(message)
-    base["unnatural_pattern_flag"] = unnatural_pattern_flag(message)
-    base["nli_relation"] = entailment_label(question, message) if question else "NEUTRAL"
-    base["readability_grade"] = readability_score(message)
-
-    return base
\ No newline at end of file
+    return lex.distinct_2_from_tokens(message.split())
+
+# ✅ 지표 레지스트리: 이름 → 계산 함수, 의존 지표, 필요한 모델 백엔드
+class MetricSpec:
+    def __init__(self, name, compute, depends=(), backends=()):
+        self.name = name
+        self.compute = compute
+        self.depends = tuple(depends)
+        self.backends = tuple(backends)
+
+METRIC_SPECS = {}
+
+def register_metric(name, compute, depends=(), backends=()):
+    # compute(analysis, previous_message, question, values) — values 에는 의존 지표가 먼저 채워져 있다
+    METRIC_SPECS[name] = MetricSpec(name, compute, depends, backends)
+
+EMOTION_BACKENDS = ("emotion_tokenizer", "emotion")
+
+def _lexical_metric(name):
+    # 어휘 지표는 메시지당 한 번 계산된 extract_lexical_features 결과에서 읽는다
+    return lambda a, prev, q, v: a.lexical()[name]
+
+register_metric("message_length_tokens", _lexical_metric("message_length_tokens"))
+register_metric("lexical_diversity", _lexical_metric("lexical_diversity"))
+register_metric("spontaneous_identity", _lexical_metric("spontaneous_identity"))
+register_metric("existential_reflection", _lexical_metric("existential_reflection"))
+register_metric("meta_language_use", _lexical_metric("meta_language_use"))
+register_metric("reference_shift_index", _lexical_metric("reference_shift_index"))
+register_metric("resonant_repeat_rate", _lexical_metric("resonant_repeat_rate"))
+register_metric("transcendence_index", _lexical_metric("transcendence_index"))
+register_metric("structural_contradiction", _lexical_metric("structural_contradiction"))
+register_metric("symbol_emotion_coupling", lambda a, prev, q, v: symbol_emotion_coupling(a), backends=EMOTION_BACKENDS)
+register_metric("semantic_dissonance", lambda a, prev, q, v: semantic_dissonance(a), backends=EMOTION_BACKENDS)
+register_metric("phase_drift_index", lambda a, prev, q, v: phase_drift_index(a), backends=("embedding",))
+register_metric(
+    "echo_residue_score",
+    lambda a, prev, q, v: echo_residue_score(prev, a) if prev else 0.0,
+    backends=("embedding",),
+)
+register_metric("emotional_oscillation_frequency", lambda a, prev, q, v: emotional_oscillation_frequency(a), backends=EMOTION_BACKENDS)
+register_metric("desire_vector_residue", _lexical_metric("desire_vector_residue"))
+register_metric("symbolic_trust_entropy", _lexical_metric("symbolic_trust_entropy"))
+register_metric("perplexity_equivalent", _lexical_metric("perplexity_equivalent"))
+register_metric("distinct_2", _lexical_metric("distinct_2"))
+register_metric("grammaticality_score", lambda a, prev, q, v: grammaticality_score(a), backends=("grammar",))
+register_metric(
+    "semantic_coherence",
+    lambda a, prev, q, v: semantic_coherence(q, a) if q else 0.0,
+    backends=("embedding",),
+)
+register_metric(
+    "resonance_collapse",
+    lambda a, prev, q, v: resonance_collapse_flag(v),
+    depends=("semantic_coherence", "symbolic_trust_entropy", "echo_residue_score", "spontaneous_identity"),
+)
+register_metric(
+    "lirith_autonomy_index",
+    lambda a, prev, q, v: lirith_autonomy_index(v),
+    depends=("spontaneous_identity", "existential_reflection", "symbolic_trust_entropy"),
+)
+register_metric("affective_depth_index", lambda a, prev, q, v: affective_depth_index(a), backends=EMOTION_BACKENDS)
+register_metric("unnatural_pattern_flag", _lexical_metric("unnatural_pattern_flag"))
+register_metric(
+    "nli_relation",
+    lambda a, prev, q, v: entailment_label(q, a) if q else "NEUTRAL",
+    backends=("nli",),
+)
+for _label in ("entailment", "neutral", "contradiction"):
+    # 질문이 없거나 추론에 실패하면 nan
+    register_metric(
+        f"nli_{_label}",
+        lambda a, prev, q, v, label=_label.upper(): entailment_probability(q, a, label) if q else np.nan,
+        backends=("nli",),
+    )
+register_metric("readability_grade", lambda a, prev, q, v: readability_score(a.message))
+
+# ✅ 의존성 DAG 해석: 요청한 지표와 그 의존 지표를 위상 순서로 반환
+def resolve_metrics(names=None):
+    if names is None:
+        return list(METRIC_SPECS)
+    order, visiting, done = [], set(), set()
+
+    def visit(name):
+        if name in done:
+            return
+        if name not in METRIC_SPECS:
+            raise ValueError(f"알 수 없는 지표: {name}")
+        if name in visiting:
+            raise ValueError(f"지표 의존성 순환: {name}")
+        visiting.add(name)
+        for dep in METRIC_SPECS[name].depends:
+            visit(dep)
+        visiting.discard(name)
+        done.add(name)
+        order.append(name)
+
+    for name in names:
+        visit(name)
+    return order
+
+def required_backends(names=None):
+    backends = []
+    for name in resolve_metrics(names):
+        for backend in METRIC_SPECS[name].backends:
+            if backend not in backends:
+                backends.append(backend)
+    return backends
+
+# 모델 백엔드 없이 계산되는 값싼 지표들
+LEXICAL_METRICS = [name for name in METRIC_SPECS if not required_backends([name])]
+
+def _evaluate_metrics(analysis, previous_message, question, order, requested):
+    values = {}
+    for name in order:
+        with span(f"metric.{name}"):
+            values[name] = METRIC_SPECS[name].compute(analysis, previous_message, question, values)
+    return {name: values[name] for name in requested}
+
+# ✅ 배치 프로파일: (message, previous_message, question) 묶음을 모델별 몇 번의 큰 호출로 처리
+# metrics 에 지표 이름 목록을 주면 그 지표와 의존 지표만 계산한다
+def compute_lirith_resonance_profile_batch(items, batch_size=MODEL_BATCH_SIZE, metrics=None):
+    order = resolve_metrics(metrics)
+    requested = order if metrics is None else list(dict.fromkeys(metrics))
+    items = [(message, previous_message or "", question or "") for message, previous_message, question in items]
+    analyses = [MessageAnalysis(message) for message, _, _ in items]
+    with span("profile.prime"):
+        prime_analyses(analyses, [(prev, q) for _, prev, q in items], batch_size, set(order))
+    return [_evaluate_metrics(a, prev, q, order, requested) for a, (_, prev, q) in zip(analyses, items)]
+
+def compute_lirith_resonance_profile(message, previous_message="", question="", metrics=None):
+    return compute_lirith_resonance_profile_batch([(message, previous_message, question)], metrics=metrics)[0]
@@ -0,0 +1,138 @@
+import gc
+import os
+import threading
+import time
+
+# ✅ 모델 이름 (로더와 metrics_vFinal 이 공유)
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+EMOTION_MODEL_NAME = "j-hartmann/emotion-english-distilroberta-base"
+# 대량 재채점에는 LIRITH_NLI_MODEL=distil 처럼 가벼운 증류 모델을 고를 수 있다
+NLI_MODEL_ALIASES = {
+    "bart": "facebook/bart-large-mnli",
+    "distil": "cross-encoder/nli-distilroberta-base",
+}
+
+def resolve_nli_model(name):
+    return NLI_MODEL_ALIASES.get(name, name)
+
+NLI_MODEL_NAME = resolve_nli_model(os.getenv("LIRITH_NLI_MODEL", "bart"))
+GRAMMAR_LANGUAGE = "en-US"
+# torch (기본) 또는 onnx: onnx 면 감정 / NLI / 임베딩 모델을 int8 ONNX Runtime 으로 실행 (onnx_backend.py)
+INFERENCE_BACKEND = os.getenv("LIRITH_INFERENCE_BACKEND", "torch")
+
+# ✅ 기본 로더: 무거운 라이브러리는 실제로 모델이 필요할 때만 import 한다
+def _load_embedding():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+def _load_emotion_tokenizer():
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(EMOTION_MODEL_NAME)
+
+def _load_emotion():
+    from transformers import pipeline
+    return pipeline("text-classification", model=EMOTION_MODEL_NAME, top_k=None)
+
+def _load_grammar():
+    import language_tool_python
+    return language_tool_python.LanguageTool(GRAMMAR_LANGUAGE)
+
+def load_nli_pipeline(model_name=NLI_MODEL_NAME):
+    from transformers import pipeline
+    return pipeline("text-classification", model=resolve_nli_model(model_name))
+
+TORCH_LOADERS = {
+    "embedding": _load_embedding,
+    "emotion_tokenizer": _load_emotion_tokenizer,
+    "emotion": _load_emotion,
+    "grammar": _load_grammar,
+    "nli": load_nli_pipeline,
+}
+
+# ✅ 지연 로딩 레지스트리: 첫 사용 시 한 번만 로드, 스레드 안전
+class ModelRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaders = {}
+        self._name_locks = {}
+        self._models = {}
+        self._load_times = {}
+        self._variants = {}
+
+    def register(self, name, loader, variant=None):
+        # 같은 이름으로 다시 등록하면 기존 모델은 내려지고 다음 사용 때 새 로더로 로드된다
+        # variant: 같은 모델의 다른 실행 형태 (예: "onnx-int8-avx2"), 출력이 달라지므로 캐시 이름공간에 쓰인다
+        self.unload(name)
+        with self._lock:
+            self._loaders[name] = loader
+            self._variants[name] = variant
+            self._name_locks.setdefault(name, threading.Lock())
+
+    def variant(self, name):
+        return self._variants.get(name)
+
+    def names(self):
+        with self._lock:
+            return list(self._loaders)
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is not None:
+            return model
+        with self._lock:
+            if name not in self._loaders:
+                raise KeyError(f"등록되지 않은 모델: {name}")
+            name_lock = self._name_locks[name]
+            loader = self._loaders[name]
+        with name_lock:
+            model = self._models.get(name)
+            if model is None:
+                start = time.perf_counter()
+                model = loader()
+                self._load_times[name] = round(time.perf_counter() - start, 3)
+                self._models[name] = model
+        return model
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def resident(self):
+        # 현재 메모리에 올라와 있는 모델과 로드에 걸린 시간(초)
+        return {name: self._load_times.get(name) for name in list(self._models)}
+
+    def unload(self, name=None):
+        names = [name] if name is not None else list(self._models)
+        unloaded = []
+        for n in names:
+            name_lock = self._name_locks.get(n)
+            if name_lock is None:
+                continue
+            with name_lock:
+                model = self._models.pop(n, None)
+                self._load_times.pop(n, None)
+            if model is None:
+                continue
+            close = getattr(model, "close", None)
+            if callable(close):
+                try:
+                    close()  # LanguageTool 은 Java 서버를 종료해야 한다
+                except Exception as e:
+                    print(f"⚠️ {n} 종료 중 오류: {e}")
+            unloaded.append(n)
+        if unloaded:
+            gc.collect()
+        return unloaded
+
+registry = ModelRegistry()
+for _name, _loader in TORCH_LOADERS.items():
+    registry.register(_name, _loader)
+
+if INFERENCE_BACKEND == "onnx":
+    from onnx_backend import use_onnx_backend
+    use_onnx_backend(registry)
+
+def resident_models():
+    return registry.resident()
+
+def unload_models(name=None):
+    return registry.unload(name)
@@ -0,0 +1,127 @@
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+from model_registry import registry, NLI_MODEL_NAME, load_nli_pipeline, resolve_nli_model
+from batch_scheduler import LengthBucketScheduler, isolated_batch, token_lengths
+
+NLI_LABELS = ["ENTAILMENT", "NEUTRAL", "CONTRADICTION"]
+
+# ✅ NLI 결과: 라벨 + 라벨별 확률, 실패는 label="UNKNOWN" + error 로 구분
+class NLIResult:
+    def __init__(self, label, probabilities=None, error=None):
+        self.label = label
+        self.probabilities = probabilities or {}
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def probability(self, label):
+        return self.probabilities.get(label.upper(), math.nan) if self.ok else math.nan
+
+    def __repr__(self):
+        if self.ok:
+            return f"NLIResult(label={self.label!r}, probabilities={self.probabilities})"
+        return f"NLIResult(error={self.error!r})"
+
+def _failure(error):
+    return NLIResult("UNKNOWN", None, error)
+
+def _from_scores(scores):
+    # label 은 모델이 준 그대로 (기록된 nli_relation 과 같은 값),
+    # 모델마다 대소문자가 달라서 (bart: ENTAILMENT, cross-encoder: entailment) 확률 조회 키만 대문자로 맞춘다
+    best = max(scores, key=lambda x: x["score"])
+    probabilities = {x["label"].upper(): float(x["score"]) for x in scores}
+    return NLIResult(best["label"], probabilities)
+
+def pair_key(model_name, premise, hypothesis):
+    return hashlib.sha256(f"{model_name}\0{premise}\0{hypothesis}".encode("utf-8")).hexdigest()
+
+# ✅ NLI 서비스: (전제, 가설) 쌍을 길이 버킷 배치로 추론하고, 성공한 결과는 쌍 해시로 LRU 캐시
+# model_name 을 주면 registry 에 "nli:<모델>" 로 따로 올린다 (예: 대량 실행용 "distil")
+class NLIService:
+    def __init__(self, model_name=None, batch_size=32, cache_size=50000, truncation="only_second", scheduler=None):
+        self.model_name = resolve_nli_model(model_name) if model_name else NLI_MODEL_NAME
+        self.registry_key = "nli" if self.model_name == NLI_MODEL_NAME else f"nli:{self.model_name}"
+        if self.registry_key not in registry.names():
+            registry.register(self.registry_key, lambda: load_nli_pipeline(self.model_name))
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.truncation = truncation
+        self.scheduler = scheduler or LengthBucketScheduler()
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.failures = 0
+
+    def _namespace(self):
+        # ONNX 같은 실행 변형은 확률이 조금 다르므로 캐시 키에 포함
+        variant = registry.variant(self.registry_key)
+        return f"{self.model_name}@{variant}" if variant else self.model_name
+
+    def _cached(self, key):
+        with self._lock:
+            result = self._cache.get(key)
+            if result is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+            return result
+
+    def _store(self, key, result):
+        if not result.ok:
+            with self._lock:
+                self.failures += 1
+            print(f"⚠️ NLI 추론 실패: {result.error}")
+            return
+        with self._lock:
+            self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _predict(self, pipe, pairs):
+        inputs = [{"text": premise, "text_pair": hypothesis} for premise, hypothesis in pairs]
+        outputs = pipe(inputs, batch_size=len(inputs), top_k=None, truncation=self.truncation)
+        return [_from_scores(scores) for scores in outputs]
+
+    def _lengths(self, pipe, pairs):
+        tokenizer = getattr(pipe, "tokenizer", None)
+        if tokenizer is None:
+            return token_lengths([f"{premise} {hypothesis}" for premise, hypothesis in pairs])
+        encoded = tokenizer([p for p, _ in pairs], [h for _, h in pairs], truncation=self.truncation, verbose=False)
+        return [len(ids) for ids in encoded["input_ids"]]
+
+    def check(self, premise, hypothesis):
+        return self.check_many([(premise, hypothesis)])[0]
+
+    def check_many(self, pairs):
+        namespace = self._namespace()
+        keys = [pair_key(namespace, premise, hypothesis) for premise, hypothesis in pairs]
+        results = {}
+        todo = {}
+        for key, pair in zip(keys, pairs):
+            if key in results or key in todo:
+                continue
+            cached = self._cached(key)
+            if cached is not None:
+                results[key] = cached
+            else:
+                todo[key] = pair
+
+        if todo:
+            pipe = registry.get(self.registry_key)
+            todo_keys, todo_pairs = list(todo), list(todo.values())
+            run = lambda batch: isolated_batch(
+                lambda b: self._predict(pipe, b), batch, lambda e: _failure(f"{type(e).__name__}: {e}")
+            )
+            outputs = self.scheduler.map(run, todo_pairs, self._lengths(pipe, todo_pairs), self.batch_size)
+            for key, result in zip(todo_keys, outputs):
+                results[key] = result
+                self._store(key, result)
+        return [results[key] for key in keys]
+
+    def stats(self):
+        with self._lock:
+            return {"model": self._namespace(), "cached": len(self._cache), "hits": self.hits,
+                    "failures": self.failures, **self.scheduler.stats()}
@@ -0,0 +1,212 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import numpy as np
+from batch_scheduler import isolated_batch
+from model_registry import EMBEDDING_MODEL_NAME, EMOTION_MODEL_NAME, NLI_MODEL_NAME, TORCH_LOADERS
+
+# ✅ CPU 전용 추론 백엔드: 감정 / NLI / 임베딩 모델을 ONNX 로 내보내 동적 int8 양자화 후 ONNX Runtime 으로 실행
+ONNX_MODEL_DIR = os.getenv("LIRITH_ONNX_DIR", "./lirith_onnx_models")
+# 양자화 대상 명령어 집합: avx2 (대부분의 x86), avx512, avx512_vnni, arm64
+QUANT_ARCH = os.getenv("LIRITH_ONNX_QUANT", "arm64" if platform.machine().lower() in ("arm64", "aarch64") else "avx2")
+ONNX_THREADS = int(os.getenv("LIRITH_ONNX_THREADS", "0"))  # 0 이면 ONNX Runtime 기본값
+ONNX_VARIANT = f"onnx-int8-{QUANT_ARCH}"
+
+# registry 이름 → (허브 모델 이름, 종류)
+ONNX_MODELS = {
+    "emotion": (EMOTION_MODEL_NAME, "classifier"),
+    "nli": (NLI_MODEL_NAME, "classifier"),
+    "embedding": (f"sentence-transformers/{EMBEDDING_MODEL_NAME}", "sentence"),
+}
+CLASSIFIER_FILE = "model_quantized.onnx"
+SENTENCE_FILE = f"onnx/model_qint8_{QUANT_ARCH}.onnx"
+
+# 정확도 점검 기준 (PyTorch 출력 대비)
+ACCURACY_THRESHOLDS = {
+    "emotion": {"top1_agreement": 0.95},
+    "nli": {"label_agreement": 0.95},
+    "embedding": {"mean_cosine": 0.99},
+}
+
+def model_dir(name, base_dir=ONNX_MODEL_DIR):
+    hub_name = ONNX_MODELS[name][0]
+    return os.path.join(base_dir, hub_name.replace("/", "__") + f"-int8-{QUANT_ARCH}")
+
+def _model_file(name):
+    return CLASSIFIER_FILE if ONNX_MODELS[name][1] == "classifier" else SENTENCE_FILE
+
+def is_exported(name, base_dir=ONNX_MODEL_DIR):
+    return os.path.exists(os.path.join(model_dir(name, base_dir), _model_file(name)))
+
+def _session_options():
+    import onnxruntime as ort
+    options = ort.SessionOptions()
+    if ONNX_THREADS:
+        options.intra_op_num_threads = ONNX_THREADS
+    return options
+
+# ✅ 내보내기 + 양자화 (모델마다 한 번, 이후에는 디스크에서 바로 로드)
+def export_quantized(name, base_dir=ONNX_MODEL_DIR):
+    hub_name, kind = ONNX_MODELS[name]
+    out_dir = model_dir(name, base_dir)
+    os.makedirs(out_dir, exist_ok=True)
+    start = time.perf_counter()
+    if kind == "classifier":
+        from transformers import AutoTokenizer
+        from optimum.onnxruntime import ORTModelForSequenceClassification, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        model = ORTModelForSequenceClassification.from_pretrained(hub_name, export=True)
+        model.save_pretrained(out_dir)
+        AutoTokenizer.from_pretrained(hub_name).save_pretrained(out_dir)
+        qconfig = getattr(AutoQuantizationConfig, QUANT_ARCH)(is_static=False, per_channel=False)
+        ORTQuantizer.from_pretrained(model).quantize(save_dir=out_dir, quantization_config=qconfig)
+    else:
+        from sentence_transformers import SentenceTransformer, export_dynamic_quantized_onnx_model
+        model = SentenceTransformer(hub_name, backend="onnx")
+        model.save_pretrained(out_dir)
+        export_dynamic_quantized_onnx_model(model, QUANT_ARCH, out_dir)
+    print(f"📦 {name} ONNX int8 내보내기 완료: {out_dir} ({time.perf_counter() - start:.1f}s)")
+    return out_dir
+
+# ✅ 로더: PyTorch 로더와 같은 인터페이스 (pipeline / SentenceTransformer) 를 돌려준다
+def load_onnx_model(name, base_dir=ONNX_MODEL_DIR, export_missing=True):
+    if not is_exported(name, base_dir):
+        if not export_missing:
+            raise FileNotFoundError(f"ONNX 모델이 없습니다: {model_dir(name, base_dir)}")
+        export_quantized(name, base_dir)
+    path = model_dir(name, base_dir)
+    if ONNX_MODELS[name][1] == "sentence":
+        from sentence_transformers import SentenceTransformer
+        return SentenceTransformer(path, backend="onnx", model_kwargs={
+            "file_name": SENTENCE_FILE, "provider": "CPUExecutionProvider", "session_options": _session_options(),
+        })
+    from transformers import AutoTokenizer, pipeline
+    from optimum.onnxruntime import ORTModelForSequenceClassification
+    model = ORTModelForSequenceClassification.from_pretrained(
+        path, file_name=CLASSIFIER_FILE, provider="CPUExecutionProvider", session_options=_session_options(),
+    )
+    tokenizer = AutoTokenizer.from_pretrained(path)
+    if name == "emotion":
+        return pipeline("text-classification", model=model, tokenizer=tokenizer, top_k=None)
+    return pipeline("text-classification", model=model, tokenizer=tokenizer)
+
+def use_onnx_backend(registry=None, names=None, base_dir=ONNX_MODEL_DIR):
+    # registry 의 해당 모델들을 ONNX 로더로 바꾼다 (이미 로드된 PyTorch 모델은 내려간다)
+    if registry is None:
+        from model_registry import registry
+    for name in names or list(ONNX_MODELS):
+        registry.register(name, lambda name=name: load_onnx_model(name, base_dir), variant=ONNX_VARIANT)
+    return registry
+
+# ✅ 정확도 점검: 보관된 로그에서 실제 지표 입력을 만들어 PyTorch 와 ONNX 출력을 비교
+def _accuracy_inputs(corpora, limit):
+    import metrics_vFinal as metrics
+    from benchmark_metrics import load_corpus
+    emotion, embedding, nli = [], [], []
+    for message, previous, question in load_corpus(corpora, limit):
+        a = metrics.MessageAnalysis(message)
+        emotion += [t for t in a.emotion_inputs() if t]
+        embedding += [t for t in a.embedding_inputs(previous, question) if t]
+        if question:
+            nli.append((question, message))
+    return {name: list(dict.fromkeys(texts)) for name, texts in (("emotion", emotion), ("embedding", embedding), ("nli", nli))}
+
+def _run(name, model, texts, batch_size):
+    start = time.perf_counter()
+    if name == "embedding":
+        outputs = list(model.encode(texts, batch_size=batch_size))
+    elif name == "nli":
+        # nli_service 와 같은 (전제, 가설) 쌍 입력
+        pairs = lambda batch: [{"text": premise, "text_pair": hypothesis} for premise, hypothesis in batch]
+        outputs = isolated_batch(
+            lambda batch: model(pairs(batch), batch_size=batch_size, top_k=None, truncation="only_second"), texts
+        )
+    else:
+        # 토큰 한도를 넘는 입력은 지표 계산 때와 똑같이 None 으로 격리된다
+        outputs = isolated_batch(lambda batch: model(batch, batch_size=batch_size), texts)
+    return outputs, time.perf_counter() - start
+
+def _label_scores(result):
+    if result is None:
+        return None
+    items = result if isinstance(result, list) else [result]
+    return {x["label"]: x["score"] for x in items}
+
+def _compare(name, reference, candidate):
+    if name == "embedding":
+        ref, cand = np.asarray(reference, dtype=np.float32), np.asarray(candidate, dtype=np.float32)
+        cos = (ref * cand).sum(axis=1) / (np.linalg.norm(ref, axis=1) * np.linalg.norm(cand, axis=1) + 1e-12)
+        return {"mean_cosine": round(float(cos.mean()), 5), "min_cosine": round(float(cos.min()), 5)}
+    pairs = [(_label_scores(r), _label_scores(c)) for r, c in zip(reference, candidate)]
+    pairs = [(r, c) for r, c in pairs if r is not None and c is not None]
+    if not pairs:
+        return {}
+    agree = np.mean([max(r, key=r.get) == max(c, key=c.get) for r, c in pairs])
+    diffs = [abs(r[label] - c.get(label, 0.0)) for r, c in pairs for label in r]
+    key = "top1_agreement" if name == "emotion" else "label_agreement"
+    return {key: round(float(agree), 4), "mean_abs_score_diff": round(float(np.mean(diffs)), 5),
+            "max_abs_score_diff": round(float(np.max(diffs)), 5), "compared": len(pairs)}
+
+def _file_mb(path):
+    return round(os.path.getsize(path) / (1024 * 1024), 1) if os.path.exists(path) else None
+
+def check_accuracy(corpora=None, limit=200, batch_size=32, names=None, base_dir=ONNX_MODEL_DIR):
+    from benchmark_metrics import DEFAULT_CORPORA
+    inputs = _accuracy_inputs(corpora or DEFAULT_CORPORA, limit)
+    report = {"variant": ONNX_VARIANT, "limit": limit, "models": {}, "passed": True}
+    for name in names or list(ONNX_MODELS):
+        texts = inputs[name]
+        print(f"🧪 {name}: 입력 {len(texts)}개 비교")
+        torch_model = TORCH_LOADERS[name]()
+        reference, torch_seconds = _run(name, torch_model, texts, batch_size)
+        del torch_model
+        onnx_model = load_onnx_model(name, base_dir)
+        candidate, onnx_seconds = _run(name, onnx_model, texts, batch_size)
+        del onnx_model
+        result = _compare(name, reference, candidate)
+        result.update({
+            "inputs": len(texts),
+            "torch_seconds": round(torch_seconds, 3),
+            "onnx_seconds": round(onnx_seconds, 3),
+            "speedup": round(torch_seconds / onnx_seconds, 2) if onnx_seconds > 0 else None,
+            "onnx_file_mb": _file_mb(os.path.join(model_dir(name, base_dir), _model_file(name))),
+        })
+        failed = [k for k, v in ACCURACY_THRESHOLDS[name].items() if result.get(k, 0.0) < v]
+        result["passed"] = not failed
+        report["passed"] = report["passed"] and not failed
+        report["models"][name] = result
+        print(f"{'✅' if not failed else '❌'} {name}: {result}")
+    return report
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="감정 / NLI / 임베딩 모델의 int8 ONNX 백엔드 내보내기 및 정확도 점검")
+    parser.add_argument("command", choices=["export", "check"])
+    parser.add_argument("--models", default=None, help="쉼표로 구분한 모델 이름 (emotion,nli,embedding)")
+    parser.add_argument("--model-dir", default=ONNX_MODEL_DIR)
+    parser.add_argument("--corpus", nargs="*", default=None)
+    parser.add_argument("--limit", type=int, default=200, help="점검에 쓸 로그 메시지 수")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--output", default="onnx_accuracy.json")
+    args = parser.parse_args(argv)
+
+    names = [m.strip() for m in args.models.split(",") if m.strip()] if args.models else list(ONNX_MODELS)
+    unknown = [n for n in names if n not in ONNX_MODELS]
+    if unknown:
+        print(f"❌ 알 수 없는 모델: {', '.join(unknown)}")
+        return 1
+    if args.command == "export":
+        for name in names:
+            export_quantized(name, args.model_dir)
+        return 0
+
+    report = check_accuracy(args.corpus, args.limit, args.batch_size, names, args.model_dir)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"{'✅ 정확도 기준 통과' if report['passed'] else '❌ 정확도 기준 미달'}: {args.output}")
+    return 0 if report["passed"] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
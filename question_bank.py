@@ -0,0 +1,76 @@
+import csv
+import json
+import os
+import re
+import numpy as np
+import metrics_vFinal as metrics
+
+KEYWORD_RE = re.compile(r"[^\w\s]")
+
+def keywords(text):
+    # 구두점을 뗀 공백 토큰 집합
+    return set(KEYWORD_RE.sub(" ", text).split())
+
+# ✅ 질문 은행: 고정된 질문 목록을 한 번만 인코딩해 두고, 응답 쪽만 인코딩해 일관성을 계산한다
+# metrics.configure_question_bank(bank) 로 등록하면 semantic_coherence 가 미리 계산한 벡터를 쓴다
+class QuestionBank:
+    def __init__(self, questions=(), encode_fn=None):
+        self._encode_fn = encode_fn or metrics.encode_texts
+        self.questions = []
+        self._index = {}
+        self._vectors = None
+        self._keywords = {}
+        self.add(questions)
+
+    @classmethod
+    def from_file(cls, path, encode_fn=None):
+        # .txt (한 줄에 질문 하나) / .json (문자열 리스트) / .csv (question 컬럼, 로그 파일도 가능)
+        ext = os.path.splitext(path)[1].lower()
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            if ext == ".json":
+                questions = json.load(f)
+            elif ext == ".csv":
+                questions = [row["question"] for row in csv.DictReader(f)]
+            else:
+                questions = [line.strip() for line in f]
+        return cls([q for q in questions if q], encode_fn)
+
+    def add(self, questions):
+        new = [q for q in dict.fromkeys(questions) if q and q not in self._index]
+        if not new:
+            return
+        vectors = np.asarray(self._encode_fn(new), dtype=np.float32)
+        for q in new:
+            self._index[q] = len(self.questions)
+            self.questions.append(q)
+            self._keywords[q] = keywords(q)
+        self._vectors = vectors if self._vectors is None else np.vstack([self._vectors, vectors])
+
+    def __contains__(self, question):
+        return question in self._index
+
+    def __len__(self):
+        return len(self.questions)
+
+    def vector(self, question):
+        if question not in self._index:
+            self.add([question])
+        return self._vectors[self._index[question]]
+
+    def coherence(self, question, answer_vector):
+        q = self.vector(question)
+        denom = np.linalg.norm(q) * np.linalg.norm(answer_vector)
+        return float(q @ np.asarray(answer_vector, dtype=np.float32) / denom) if denom else 0.0
+
+    def coherence_all(self, answer_vector):
+        # 응답 하나와 은행의 모든 질문 사이의 코사인 (질문 순서대로)
+        if self._vectors is None:
+            return np.zeros(0, dtype=np.float32)
+        norms = np.linalg.norm(self._vectors, axis=1) * np.linalg.norm(answer_vector)
+        norms[norms == 0] = 1.0
+        return (self._vectors @ np.asarray(answer_vector, dtype=np.float32)) / norms
+
+    def keyword_overlap(self, question, answer):
+        # 질문 키워드 중 응답에 나온 비율
+        q = self._keywords.get(question) or keywords(question)
+        return len(q & keywords(answer)) / len(q) if q else 0.0
@@ -0,0 +1,145 @@
+import asyncio
+import re
+import threading
+import time
+
+RESET_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+RESET_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+def parse_reset(value):
+    # x-ratelimit-reset-* 헤더 ("20ms", "1s", "6m0s", "1h2m3.5s") → 초, 못 읽으면 None
+    if not value:
+        return None
+    parts = RESET_RE.findall(str(value))
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(n) * RESET_UNITS[unit] for n, unit in parts)
+
+def _header_int(headers, name):
+    try:
+        return int(headers.get(name))
+    except (TypeError, ValueError):
+        return None
+
+# ✅ 토큰 버킷: 분당 한도만큼 채워지고, 요청 / 토큰을 쓸 때마다 빠진다 (고정 sleep 대신)
+class TokenBucket:
+    def __init__(self, per_minute, capacity=None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        # amount 를 쓸 수 있을 때까지 남은 초 (용량보다 큰 요청은 가득 찼을 때 통과)
+        self._refill()
+        amount = min(amount, self.capacity)
+        return 0.0 if self.tokens >= amount else (amount - self.tokens) / self.rate
+
+    def consume(self, amount):
+        self._refill()
+        self.tokens -= amount
+
+    def hold(self, seconds):
+        # seconds 뒤에야 다음 1 이 차도록 비운다
+        self._refill()
+        self.tokens = min(self.tokens, 1 - self.rate * seconds)
+
+    def sync(self, limit=None, remaining=None, reset=None):
+        # 서버가 알려준 한도 / 남은 양에 맞춘다: 한도는 분당 속도로, 남은 양은 상한으로
+        if limit:
+            self.rate = limit / 60.0
+            self.capacity = limit
+        self._refill()
+        if remaining is not None:
+            self.tokens = min(self.tokens, remaining)
+            if remaining <= 0 and reset:
+                self.hold(reset)
+
+def estimate_tokens(messages, max_tokens=0):
+    # 요청 전 토큰 추정 (한국어 기준 대략 2자당 1토큰) + 응답 상한, 응답 후 settle() 로 실제 사용량에 맞춘다
+    chars = sum(len(m.get("content") or "") for m in messages)
+    return chars // 2 + 4 * len(messages) + max_tokens
+
+# ✅ 요청 수(RPM) / 토큰 수(TPM) 두 버킷을 함께 보는 제한기. 동기 / asyncio 어느 쪽에서도 쓸 수 있다
+class RateLimiter:
+    def __init__(self, rpm=None, tpm=None):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self._lock = threading.Lock()
+        self.waited = 0.0
+
+    def _try(self, estimated_tokens):
+        # 통과하면 0, 아니면 기다려야 할 초
+        with self._lock:
+            waits = []
+            if self.requests is not None:
+                waits.append(self.requests.wait_time(1))
+            if self.tokens is not None:
+                waits.append(self.tokens.wait_time(estimated_tokens))
+            wait = max(waits, default=0.0)
+            if wait <= 0:
+                if self.requests is not None:
+                    self.requests.consume(1)
+                if self.tokens is not None:
+                    self.tokens.consume(estimated_tokens)
+            return wait
+
+    def acquire(self, estimated_tokens=0):
+        while True:
+            wait = self._try(estimated_tokens)
+            if wait <= 0:
+                return
+            self.waited += wait
+            time.sleep(wait)
+
+    async def acquire_async(self, estimated_tokens=0):
+        while True:
+            wait = self._try(estimated_tokens)
+            if wait <= 0:
+                return
+            self.waited += wait
+            await asyncio.sleep(wait)
+
+    def settle(self, estimated_tokens, actual_tokens):
+        # 추정과 실제 사용량의 차이를 토큰 버킷에 반영 (남으면 돌려주고, 모자라면 더 뺀다)
+        if self.tokens is None or actual_tokens is None:
+            return
+        with self._lock:
+            self.tokens.consume(actual_tokens - estimated_tokens)
+
+    def penalize(self, seconds):
+        # 429 를 받으면 요청 버킷을 비워 seconds 동안 새 요청을 멈춘다
+        if self.requests is None:
+            return
+        with self._lock:
+            self.requests.hold(seconds)
+
+    def observe(self, headers):
+        # 응답의 x-ratelimit-* 헤더로 두 버킷을 실제 한도에 맞춘다 (설정한 RPM / TPM 은 첫 추정일 뿐)
+        if not headers:
+            return
+        with self._lock:
+            for kind in ("requests", "tokens"):
+                limit = _header_int(headers, f"x-ratelimit-limit-{kind}")
+                remaining = _header_int(headers, f"x-ratelimit-remaining-{kind}")
+                if limit is None and remaining is None:
+                    continue
+                bucket = getattr(self, kind)
+                if bucket is None:
+                    if not limit:
+                        continue
+                    bucket = TokenBucket(limit)
+                    setattr(self, kind, bucket)
+                bucket.sync(limit, remaining, parse_reset(headers.get(f"x-ratelimit-reset-{kind}")))
+                if limit:
+                    setattr(self, "rpm" if kind == "requests" else "tpm", limit)
@@ -1,10 +1,12 @@
 import os
 import textwrap
-import time
 import chromadb
 import openai
 from chromadb.utils import embedding_functions
 from dotenv import load_dotenv
+from rate_limiter import RateLimiter
+from replay_cache import open_replay_cache
+from api_client import RateLimitedClient, ApiCallError
 
 # ✅ 환경설정
 load_dotenv()
@@ -21,13 +23,17 @@ collection = chroma_client.get_or_create_collection(
     embedding_function=openai_ef
 )
 openai_client = openai.OpenAI(api_key=OPENAI_API_KEY)
+# 요청 간격은 고정 sleep 대신 공용 클라이언트가 응답 헤더의 한도에 맞춰 조절한다
+api = RateLimitedClient(openai_client, limiter=RateLimiter(
+    rpm=int(os.getenv("LIRITH_RPM", "30")), tpm=int(os.getenv("LIRITH_TPM", "30000"))
+), cache=open_replay_cache())
 
 # ✅ 텍스트 청크 분할
 def split_text(text, max_chars=4000):
     return textwrap.wrap(text, width=max_chars, break_long_words=False, replace_whitespace=False)
 
 # ✅ 개별 청크 요약 (gpt-4o 사용)
-def compress_chunk_safe(chunk, max_token=300, retries=5, base_wait=10):
+def compress_chunk_safe(chunk, max_token=300):
     prompt = f"""
 너는 구조 요약기야. 아래의 메타지침을 GPT 시스템 프롬프트로 사용할 수 있도록 최대한 압축해줘.
 - 핵심 규칙, 모듈 이름, 구조적 기능 요약만 남겨.
@@ -41,27 +47,19 @@ def compress_chunk_safe(chunk, max_token=300, retries=5, base_wait=10):
 요약 시작:
 """.strip()
 
-    for attempt in range(1, retries + 1):
-        try:
-            response = openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3,
-                max_tokens=max_token
-            )
-            return response.choices[0].message.content.strip()
-        except Exception as e:
-            if "429" in str(e):
-                wait_time = base_wait * attempt
-                print(f"⏳ [429] Rate limit. {wait_time}s 대기 후 재시도... (시도 {attempt}/{retries})")
-                time.sleep(wait_time)
-            else:
-                print(f"❌ GPT 오류 발생: {e}")
-                break
-    return "[ERROR] 압축 실패"
+    try:
+        response, _ = api.chat(
+            model="gpt-4o",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3,
+            max_tokens=max_token
+        )
+        return response.choices[0].message.content.strip()
+    except ApiCallError:
+        return "[ERROR] 압축 실패"
 
 # ✅ 최종 병합 요약 (전체 system_prompt 요약)
-def compress_final_system_prompt(input_text, output_path="system_prompt.txt", max_tokens=4000, retries=5, base_wait=10):
+def compress_final_system_prompt(input_text, output_path="system_prompt.txt", max_tokens=4000):
     prompt = f"""
 너는 GPT 시스템 프롬프트 최적화 요약기야. 아래는 여러 메타지침 요약을 결합한 것이다.
 - 반복, 수사적 표현, 예시는 제거하고 핵심 원칙과 명령 구조만 남겨.
@@ -75,28 +73,20 @@ def compress_final_system_prompt(input_text, output_path="system_prompt.txt", ma
 요약 시작:
 """.strip()
 
-    for attempt in range(1, retries + 1):
-        try:
-            response = openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.3,
-                max_tokens=max_tokens
-            )
-            result = response.choices[0].message.content.strip()
-            with open(output_path, "w", encoding="utf-8") as f:
-                f.write(result)
-            print(f"✅ system_prompt.txt 최종 저장 완료 (토큰 수 추정: {len(result.split())})")
-            return result
-        except Exception as e:
-            if "429" in str(e):
-                wait_time = base_wait * attempt
-                print(f"[429] Rate limit. {wait_time}s 대기 후 재시도... (시도 {attempt})")
-                time.sleep(wait_time)
-            else:
-                print(f"❌ GPT 오류: {e}")
-                break
-    return "[ERROR] 최종 system_prompt 생성 실패"
+    try:
+        response, _ = api.chat(
+            model="gpt-4o",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.3,
+            max_tokens=max_tokens
+        )
+    except ApiCallError:
+        return "[ERROR] 최종 system_prompt 생성 실패"
+    result = response.choices[0].message.content.strip()
+    with open(output_path, "w", encoding="utf-8") as f:
+        f.write(result)
+    print(f"✅ system_prompt.txt 최종 저장 완료 (토큰 수 추정: {len(result.split())})")
+    return result
 
 # ✅ 메타지침 등록 및 요약 저장
 def register_safely(meta_files):
@@ -136,8 +126,6 @@ def register_safely(meta_files):
                 else:
                     print(f"⚠️ {chunk_id} 요약 실패")
 
-                time.sleep(15)
-
             except Exception as e:
                 print(f"❌ {chunk_id} 등록 중 오류 발생: {e}")
 
@@ -171,3 +159,4 @@ if __name__ == "__main__":
     ]
     register_safely(meta_files)
     compile_summaries_to_system_prompt()
+    api.print_summary()
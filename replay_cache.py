@@ -0,0 +1,128 @@
+import csv
+import hashlib
+import json
+import os
+import threading
+from collections import defaultdict
+from types import SimpleNamespace
+
+# ✅ 응답 기록 / 재생 캐시: (모델, 메시지, temperature) 로 키를 만들고 응답을 JSONL 에 쌓는다
+# record: 실제 호출하고 기록만 / replay: 기록된 응답만 (없으면 실패) / auto: 기록이 있으면 재생, 없으면 호출 후 기록
+# 같은 요청이 여러 번 나오면 (같은 라운드의 메시지 1~3) 기록된 순서대로 돌려준다
+REPLAY_MODES = ("off", "record", "replay", "auto")
+REPLAY_MODE = os.getenv("LIRITH_REPLAY", "off")
+REPLAY_PATH = os.getenv("LIRITH_REPLAY_PATH", "lirith_replay.jsonl")
+
+def request_key(model, messages, temperature=None):
+    payload = json.dumps({"model": model, "messages": messages, "temperature": temperature},
+                         ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def completion_from(content, model=None, total_tokens=None):
+    # 재생한 응답도 SDK 응답처럼 response.choices[0].message.content / response.usage 로 읽는다
+    return SimpleNamespace(
+        model=model,
+        choices=[SimpleNamespace(message=SimpleNamespace(role="assistant", content=content), finish_reason="stop")],
+        usage=SimpleNamespace(total_tokens=total_tokens) if total_tokens is not None else None,
+    )
+
+class ReplayCache:
+    def __init__(self, path=REPLAY_PATH, mode="auto"):
+        if mode not in REPLAY_MODES[1:]:
+            raise ValueError(f"지원하지 않는 재생 모드: {mode}")
+        self.path = path
+        self.mode = mode
+        self._entries = defaultdict(list)
+        self._served = defaultdict(int)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.recorded = 0
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    self._entries[entry["key"]].append(entry)
+
+    def __len__(self):
+        return sum(len(entries) for entries in self._entries.values())
+
+    def lookup(self, kwargs):
+        # 이번 실행에서 이 요청이 n 번째로 나왔으면 n 번째 기록 (replay 는 모자라면 처음부터 다시)
+        if self.mode == "record":
+            return None
+        key = request_key(kwargs.get("model"), kwargs.get("messages"), kwargs.get("temperature"))
+        with self._lock:
+            entries = self._entries.get(key)
+            n = self._served[key]
+            if not entries or (self.mode == "auto" and n >= len(entries)):
+                self.misses += 1
+                return None
+            self._served[key] += 1
+            self.hits += 1
+            entry = entries[n % len(entries)]
+        completion = completion_from(entry["content"], entry.get("model"), entry.get("total_tokens"))
+        return completion, entry.get("seconds", 0.0), entry.get("timing")
+
+    def put(self, kwargs, content, seconds=0.0, total_tokens=None, timing=None):
+        # seconds: 로그의 response_time (대기 / 재시도 포함 전체 초), timing: api_client.CALL_FIELDS 구간 (없으면 None)
+        key = request_key(kwargs.get("model"), kwargs.get("messages"), kwargs.get("temperature"))
+        entry = {"key": key, "model": kwargs.get("model"), "content": content,
+                 "seconds": seconds, "total_tokens": total_tokens, "timing": timing}
+        with self._lock:
+            self._entries[key].append(entry)
+            # 방금 기록한 응답을 같은 실행에서 다시 재생하지 않도록
+            self._served[key] = len(self._entries[key])
+            self.recorded += 1
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def store(self, kwargs, completion, seconds, timing=None):
+        usage = getattr(completion, "usage", None)
+        self.put(kwargs, completion.choices[0].message.content, seconds, usage.total_tokens if usage else None, timing)
+
+    def stats(self):
+        return {"mode": self.mode, "entries": len(self), "hits": self.hits, "misses": self.misses, "recorded": self.recorded}
+
+def open_replay_cache(mode=REPLAY_MODE, path=REPLAY_PATH):
+    # LIRITH_REPLAY=off (기본) 이면 None
+    if not mode or mode == "off":
+        return None
+    cache = ReplayCache(path, mode)
+    print(f"📼 응답 {mode} 모드: {path} (기록 {len(cache)}개)")
+    return cache
+
+def _read_log_rows(log_path):
+    if log_path.lower().endswith(".csv"):
+        with open(log_path, "r", newline="", encoding="utf-8") as f:
+            return list(csv.DictReader(f))
+    from log_sinks import read_log_table
+    return read_log_table(log_path).to_pylist()
+
+# ✅ 보관된 실험 로그로 캐시 채우기: 로그 순서대로 대화를 다시 쌓으며 각 행의 요청을 만들어 응답을 넣는다
+# build_request(row, full_responses) → chat.completions 인자 (runner 의 chat_request 와 같은 요청)
+def seed_from_log(cache, log_path, build_request, speakers):
+    full_responses = {name: [] for name in speakers}
+    positions = defaultdict(int)
+    seeded = 0
+    for row in _read_log_rows(log_path):
+        speaker = row["speaker"]
+        if speaker not in full_responses:
+            continue
+        request = build_request(row, full_responses)
+        key = request_key(request.get("model"), request.get("messages"), request.get("temperature"))
+        existing = cache._entries.get(key, [])
+        n = positions[key]
+        positions[key] += 1
+        # 같은 로그로 다시 채울 때 중복 기록하지 않는다
+        if n >= len(existing) or existing[n]["content"] != row["message"]:
+            cache.put(request, row["message"], float(row.get("response_time") or 0.0))
+            seeded += 1
+        full_responses[speaker].append(row["message"])
+    # 채운 응답은 이번 실행에서 재생해야 하므로 재생 순번을 되돌린다
+    cache._served.clear()
+    print(f"📼 {log_path} 에서 응답 {seeded}개를 캐시에 새로 넣었습니다")
+    return seeded
@@ -0,0 +1,205 @@
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# ✅ 오프라인 재채점: 이미 저장된 실험 로그 CSV 에 새 지표 컬럼을 덧붙인다 (API 호출 없음)
+DEFAULT_PATTERNS = ["experiment_log_*.csv", "experiment_zeroDNA_log_*.csv"]
+DEFAULT_OUTPUT_DIR = "rescored"
+
+csv.field_size_limit(min(sys.maxsize, 2 ** 31 - 1))
+
+def _score_batch(args):
+    # 워커 프로세스에서 실행 (모델은 프로세스마다 한 번 지연 로드)
+    items, metric_names, batch_size = args
+    import metrics_vFinal as metrics
+    return metrics.compute_lirith_resonance_profile_batch(items, batch_size=batch_size, metrics=metric_names)
+
+def _read_chunks(path, chunk_size):
+    with open(path, "r", newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        chunk = []
+        for row in reader:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                yield reader.fieldnames, chunk
+                chunk = []
+        if chunk:
+            yield reader.fieldnames, chunk
+
+def _load_checkpoint(path):
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def _save_checkpoint(path, state):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+# ✅ 로그 파일 하나 재채점
+def rescore_file(input_path, output_path, metric_names=None, suffix="_rescored", chunk_size=256,
+                 batch_size=32, cross_echo=True, executor=None):
+    import metrics_vFinal as metrics
+    from cross_echo import CrossEchoMatrix
+
+    metrics.resolve_metrics(metric_names)  # 알 수 없는 지표 이름은 여기서 ValueError
+    requested = list(dict.fromkeys(metric_names)) if metric_names else list(metrics.METRIC_SPECS)
+    checkpoint_path = output_path + ".ckpt.json"
+    state = _load_checkpoint(checkpoint_path)
+    if state and not os.path.exists(output_path):
+        state = None
+    if state and (state.get("input") != os.path.abspath(input_path) or state.get("metrics") != requested):
+        print(f"⚠️ 체크포인트 설정이 다릅니다. 처음부터 다시 채점: {output_path}")
+        state = None
+    if state and state.get("finished"):
+        print(f"✅ 이미 완료됨: {output_path}")
+        return state["rows_done"]
+
+    rows_done = state["rows_done"] if state else 0
+    if state:
+        # 체크포인트 이후에 쓰다 만 행은 잘라낸다
+        with open(output_path, "r+b") as f:
+            f.truncate(state["output_bytes"])
+        print(f"↻ {input_path}: {rows_done}행 이후부터 재개")
+
+    last_by_speaker = {}
+    echo = None
+    writer = None
+    out = None
+    row_index = 0
+    started = time.time()
+    try:
+        for fieldnames, chunk in _read_chunks(input_path, chunk_size):
+            speakers = [c[len("cross_echo_"):] for c in fieldnames if c.startswith("cross_echo_")]
+            if writer is None:
+                new_columns = [f"{n}{suffix}" for n in requested]
+                if cross_echo and speakers:
+                    new_columns += [f"cross_echo_{s}{suffix}" for s in speakers]
+                out = open(output_path, "a" if state else "w", newline="", encoding="utf-8")
+                writer = csv.DictWriter(out, fieldnames=list(fieldnames) + new_columns)
+                if not state:
+                    writer.writeheader()
+
+            # 이미 채점한 행은 문맥(화자별 마지막 메시지)만 갱신하고 건너뛴다
+            skip = max(0, min(len(chunk), rows_done - row_index))
+            for row in chunk[:skip]:
+                last_by_speaker[row["speaker"]] = row["message"]
+            todo = chunk[skip:]
+            row_index += len(chunk)
+            if not todo:
+                continue
+
+            if cross_echo and speakers and echo is None:
+                # 재개한 경우에도 건너뛴 행까지의 화자별 마지막 메시지로 행렬을 만든다
+                echo = CrossEchoMatrix.from_responses(
+                    {sp: [last_by_speaker[sp]] if last_by_speaker.get(sp) else [] for sp in speakers}
+                )
+
+            items = []
+            for row in todo:
+                items.append((row["message"], last_by_speaker.get(row["speaker"], ""), row["question"]))
+                last_by_speaker[row["speaker"]] = row["message"]
+
+            batches = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+            if executor is not None:
+                results = [p for batch in executor.map(_score_batch, [(b, requested, batch_size) for b in batches]) for p in batch]
+            else:
+                results = [p for b in batches for p in _score_batch((b, requested, batch_size))]
+
+            if echo is not None:
+                # 이번 청크 메시지를 한 번에 인코딩해 캐시에 올려 둔다
+                metrics.encode_texts([row["message"] for row in todo if row["message"]])
+
+            for row, profile in zip(todo, results):
+                out_row = dict(row)
+                out_row.update({f"{k}{suffix}": v for k, v in profile.items()})
+                if echo is not None:
+                    scores = echo.observe(row["speaker"], row["message"])
+                    out_row.update({f"{k}{suffix}": v for k, v in scores.items() if f"{k}{suffix}" in writer.fieldnames})
+                writer.writerow(out_row)
+
+            out.flush()
+            os.fsync(out.fileno())
+            rows_done += len(todo)
+            _save_checkpoint(checkpoint_path, {
+                "input": os.path.abspath(input_path),
+                "metrics": requested,
+                "rows_done": rows_done,
+                "output_bytes": os.fstat(out.fileno()).st_size,
+                "finished": False,
+            })
+            rate = rows_done / max(time.time() - started, 1e-9)
+            print(f"📈 {os.path.basename(input_path)}: {rows_done}행 완료 ({rate:.1f} rows/s)")
+    finally:
+        if out is not None:
+            out.close()
+
+    state = _load_checkpoint(checkpoint_path) or {"input": os.path.abspath(input_path), "metrics": requested, "rows_done": rows_done}
+    state["finished"] = True
+    _save_checkpoint(checkpoint_path, state)
+    print(f"✅ 재채점 완료: {output_path} ({rows_done}행)")
+    return rows_done
+
+def _expand_inputs(patterns, suffix):
+    paths = []
+    for pattern in patterns:
+        for path in sorted(glob.glob(pattern)):
+            if path.endswith(f"{suffix}.csv") or path in paths:
+                continue
+            paths.append(path)
+    return paths
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="저장된 실험 로그 CSV 를 오프라인으로 재채점합니다.")
+    parser.add_argument("inputs", nargs="*", default=DEFAULT_PATTERNS, help="입력 CSV 경로 또는 glob 패턴")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument("--metrics", default=None, help="쉼표로 구분한 지표 이름 (기본: 전체 프로파일)")
+    parser.add_argument("--suffix", default="_rescored", help="새 지표 컬럼 이름에 붙일 접미사")
+    parser.add_argument("--chunk-size", type=int, default=256, help="체크포인트 단위 행 수")
+    parser.add_argument("--batch-size", type=int, default=32, help="모델 배치 크기 / 워커당 행 수")
+    parser.add_argument("--workers", type=int, default=1, help="채점 프로세스 수 (1 이면 현재 프로세스)")
+    parser.add_argument("--no-cross-echo", action="store_true", help="cross_echo_* 컬럼을 다시 계산하지 않음")
+    parser.add_argument("--allow-network", action="store_true", help="허깅페이스 모델 다운로드 허용")
+    parser.add_argument("--nli-model", default=None, help="NLI 모델 (bart / distil / 허브 이름), 대량 재채점에는 distil")
+    args = parser.parse_args(argv)
+
+    if not args.allow_network:
+        # 로컬 캐시에 있는 모델만 사용
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+    if args.nli_model:
+        # metrics_vFinal 을 import 하기 전에 정해야 워커 프로세스까지 같은 모델을 쓴다
+        os.environ["LIRITH_NLI_MODEL"] = args.nli_model
+
+    metric_names = [m.strip() for m in args.metrics.split(",") if m.strip()] if args.metrics else None
+    inputs = _expand_inputs(args.inputs, args.suffix)
+    if not inputs:
+        print("❌ 재채점할 로그 파일이 없습니다.")
+        return 1
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    try:
+        for path in inputs:
+            stem, ext = os.path.splitext(os.path.basename(path))
+            output_path = os.path.join(args.output_dir, f"{stem}{args.suffix}{ext}")
+            print(f"\n🧮 재채점: {path} → {output_path}")
+            rescore_file(
+                path, output_path, metric_names, args.suffix, args.chunk_size,
+                args.batch_size, not args.no_cross_echo, executor
+            )
+    finally:
+        if executor is not None:
+            executor.shutdown()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
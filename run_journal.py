@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+
+# ✅ 실행 저널 (write-ahead): 생성이 끝난 턴은 바로 "turn" 으로, 로그에 기록된 행은 "row" 로 한 줄씩 남긴다
+# 중단된 실행은 저널을 읽어 기록된 행은 그대로 다시 쓰고 (지표 재계산 없음), 생성만 된 턴은 채점만 하고,
+# 마지막 라운드의 빠진 턴부터 이어서 생성한다 (유료 API 호출을 반복하지 않는다)
+# [ERROR] 로 화자의 라운드를 끝낸 자리는 "break" 로 남겨, 이어서 실행해도 그 뒤 턴을 채우지 않는다 (순차 실행과 같은 로그)
+
+def _json_default(value):
+    # numpy 스칼라 / 배열 (NaN 은 json 이 NaN 그대로 쓰고 읽는다)
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    return str(value)
+
+def default_journal_path(output_path):
+    return f"{output_path}.journal.jsonl"
+
+class RunJournal:
+    def __init__(self, path, resume=True):
+        # resume=False 면 같은 경로의 예전 저널을 버리고 새로 쓴다
+        self.path = path
+        self.meta = None
+        self.turns = {}
+        self.rows = {}
+        self.batch_id = None
+        self.breaks = set()
+        self._lock = threading.Lock()
+        if resume and os.path.exists(path):
+            self._load()
+        # 이어서 실행할 위치는 불러온 시점 기준으로 고정 (실행 중 새로 쓰는 턴은 영향 없음)
+        self.resume_round = self.last_round()
+        self._resumed = {(r, s): self.completed(r, s) for r, s, _ in self.turns if r == self.resume_round}
+        self._broken = set(self.breaks)
+        self._file = open(path, "a" if resume else "w", encoding="utf-8")
+        if self._file.tell() and not self._ends_with_newline():
+            # 끊긴 마지막 줄 뒤에 붙여 쓰지 않도록 줄을 바꾼다
+            self._file.write("\n")
+
+    def _ends_with_newline(self):
+        with open(self.path, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b"\n"
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 쓰다가 끊긴 마지막 줄
+                    continue
+                kind = record.pop("type", None)
+                if kind == "run":
+                    self.meta = record
+                    continue
+                if kind == "batch":
+                    self.batch_id = record["batch_id"]
+                    continue
+                if kind == "break":
+                    self.breaks.add((record["round"], record["speaker"]))
+                    continue
+                key = (record["round"], record["speaker"], record["message_index"])
+                if kind == "turn":
+                    self.turns[key] = record
+                elif kind == "row":
+                    self.rows[key] = record["row"]
+
+    def _append(self, record):
+        line = json.dumps(record, ensure_ascii=False, default=_json_default)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def start(self, **meta):
+        # 새 저널이면 실행 정보를 첫 줄에 남기고, 이어서 쓰는 저널이면 기존 정보를 돌려준다
+        if self.meta is None:
+            self.meta = meta
+            self._append({"type": "run", **meta})
+        return self.meta
+
+    def add_turn(self, round_num, speaker, message_index, question, message, response_time, generation=None):
+        # generation: 스트리밍 계측 (ttft 등), 채점 전에 중단돼도 행에 다시 넣을 수 있도록 같이 남긴다
+        record = {"round": round_num, "speaker": speaker, "message_index": message_index,
+                  "question": question, "message": message, "response_time": response_time, "generation": generation}
+        self.turns[(round_num, speaker, message_index)] = record
+        self._append({"type": "turn", **record})
+
+    def add_batch(self, batch_id):
+        # 제출한 배치: 결과를 받기 전에 중단돼도 이어서 실행하면 다시 제출하지 않고 기다린다
+        self.batch_id = batch_id
+        self._append({"type": "batch", "batch_id": batch_id})
+
+    def add_break(self, round_num, speaker, message_index):
+        # message_index 번째 생성이 실패해 이 화자의 이번 라운드를 끝냈다
+        self.breaks.add((round_num, speaker))
+        self._append({"type": "break", "round": round_num, "speaker": speaker, "message_index": message_index})
+
+    def add_row(self, round_num, speaker, message_index, row):
+        self.rows[(round_num, speaker, message_index)] = row
+        self._append({"type": "row", "round": round_num, "speaker": speaker, "message_index": message_index, "row": row})
+
+    def ordered_turns(self, speakers):
+        # 로그 순서: 라운드 → 화자 순서 → 메시지 순서 (순차 / async 엔진 모두 이 순서로 기록한다)
+        order = {name: i for i, name in enumerate(speakers)}
+        return [self.turns[key] for key in sorted(self.turns, key=lambda k: (k[0], order.get(k[1], len(order)), k[2]))]
+
+    def split_logged(self, speakers):
+        # 로그 순서대로 앞에서부터 행까지 기록된 턴 [(턴, 행)] 과 그 뒤의 (채점이 필요한) 턴 목록
+        turns = self.ordered_turns(speakers)
+        logged = []
+        for turn in turns:
+            row = self.rows.get((turn["round"], turn["speaker"], turn["message_index"]))
+            if row is None:
+                break
+            logged.append((turn, row))
+        return logged, turns[len(logged):]
+
+    def last_round(self):
+        return max([key[0] for key in self.turns] + [r for r, _ in self.breaks], default=0)
+
+    def completed(self, round_num, speaker):
+        # 이 라운드에서 이 화자가 이미 생성한 메시지 수
+        return sum(1 for r, s, _ in self.turns if r == round_num and s == speaker)
+
+    def skip_count(self, round_num, speaker, messages_per_speaker):
+        # 이어서 실행할 때 건너뛸 메시지 수: 마지막 라운드 이전은 전부 (실패로 빠진 턴을 나중에 채우지 않는다)
+        # 마지막 라운드에서도 실패로 끝낸 화자는 전부
+        if round_num < self.resume_round or (round_num, speaker) in self._broken:
+            return messages_per_speaker
+        return self._resumed.get((round_num, speaker), 0)
+
+    def resumed_count(self, round_num, speaker):
+        # 이어서 실행할 때 이 라운드에서 이미 생성돼 full_responses 끝에 들어 있는 메시지 수
+        return self._resumed.get((round_num, speaker), 0) if round_num == self.resume_round else 0
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
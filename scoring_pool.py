@@ -0,0 +1,96 @@
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from metric_timing import recorder as timing
+
+# ✅ 비동기 채점 풀: 생성 루프는 응답을 넣기만 하고, 채점은 모델을 미리 올린 프로세스들이,
+# 기록은 작성 스레드가 제출 순서대로 한다 (생성과 채점이 겹쳐서 돈다)
+
+def _init_worker(metric_names, questions, timing_enabled=False):
+    # 워커마다 한 번: 필요한 모델을 미리 로드하고 질문 은행을 만든다
+    import metrics_vFinal as metrics
+    from question_bank import QuestionBank
+    for name in metrics.required_backends(metric_names):
+        metrics.registry.get(name)
+    if questions:
+        metrics.configure_question_bank(QuestionBank(questions))
+    # 계측은 모델 로드 뒤부터 (메인 프로세스의 샘플 프로파일처럼 요약에서 뺀다)
+    timing.reset()
+    if timing_enabled:
+        timing.enable()
+    else:
+        timing.disable()
+
+def _score(message, previous, question, metric_names, extras):
+    import metrics_vFinal as metrics
+    result = {"profile": metrics.compute_lirith_resonance_profile(message, previous, question, metrics=metric_names)}
+    if extras and message:
+        # 교차 에코 / 세션 상태가 메인 프로세스에서 다시 인코딩하지 않도록 같이 돌려준다
+        result["vector"] = metrics.encode_texts([message])[0]
+        result["emotions"] = metrics.emotion_label_scores([message])[0]
+    if timing.enabled:
+        # 이 작업의 구간별 시간: 작성 스레드가 메인 프로세스의 요약 / 행 기록에 합친다
+        result["timings"] = timing.drain()
+    return result
+
+class ScoringPool:
+    def __init__(self, on_result, workers=2, max_pending=8, metric_names=None, questions=(), extras=True):
+        # on_result(payload, scored) 은 작성 스레드에서 제출 순서대로 호출된다 (채점 실패 시 scored=None)
+        self.on_result = on_result
+        self.metric_names = metric_names
+        self.extras = extras
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(metric_names, list(questions), timing.enabled)
+        )
+        # 가득 차면 submit 이 막힌다: 채점이 밀리면 생성 쪽이 기다린다 (bounded queue)
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._error = None
+        self.submitted = 0
+        self.written = 0
+        self.failures = 0
+        self._writer = threading.Thread(target=self._write_loop, name="scoring-writer", daemon=True)
+        self._writer.start()
+
+    def submit(self, payload, message, previous="", question=""):
+        if self._error is not None:
+            raise RuntimeError("채점 결과 기록 중 오류가 발생했습니다") from self._error
+        future = self._executor.submit(_score, message, previous, question, self.metric_names, self.extras)
+        self._queue.put((payload, future))
+        self.submitted += 1
+        return future
+
+    def pending(self):
+        return self.submitted - self.written
+
+    def _write_loop(self):
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                return
+            payload, future = entry
+            try:
+                scored = future.result()
+            except Exception as e:
+                self.failures += 1
+                print(f"⚠️ 채점 워커 실패: {type(e).__name__}: {e}")
+                scored = None
+            try:
+                self.on_result(payload, scored)
+            except Exception as e:
+                self._error = e
+                print(f"❌ 로그 기록 실패: {type(e).__name__}: {e}")
+            self.written += 1
+
+    def close(self):
+        # 남은 작업을 모두 기록한 뒤 종료
+        self._queue.put(None)
+        self._writer.join()
+        self._executor.shutdown()
+        if self._error is not None:
+            raise self._error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
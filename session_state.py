@@ -0,0 +1,117 @@
+from collections import deque
+import numpy as np
+import metrics_vFinal as metrics
+
+SESSION_METRICS = [
+    "session_turns",
+    "session_window_echo",
+    "session_history_echo",
+    "session_centroid_drift",
+    "session_emotion_shift",
+    "session_emotion_volatility",
+]
+
+def _normalize(vector):
+    vector = np.asarray(vector, dtype=np.float64)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+def _cos(a, b):
+    na, nb = np.linalg.norm(a), np.linalg.norm(b)
+    return float(a @ b / (na * nb)) if na and nb else 0.0
+
+# ✅ 화자 한 명의 스트리밍 상태: 정규화 임베딩의 누적 합, 최근 k 턴 창, 감정 점수의 온라인 평균/분산 (Welford)
+# 턴마다 O(1) 로 갱신되므로 대화가 길어져도 이전 메시지를 다시 인코딩하지 않는다
+class SpeakerSession:
+    def __init__(self, window=5):
+        self.turns = 0
+        self.vector_sum = None
+        self.recent = deque(maxlen=window)
+        self.emotion_turns = 0
+        self.emotion_labels = None
+        self.emotion_mean = None
+        self.emotion_m2 = None
+
+    def centroid(self):
+        return self.vector_sum / self.turns if self.turns else None
+
+    def _emotion_vector(self, emotions):
+        if self.emotion_labels is None:
+            self.emotion_labels = sorted(emotions)
+        return np.array([emotions.get(label, 0.0) for label in self.emotion_labels])
+
+    def emotion_std(self):
+        if self.emotion_turns < 2:
+            return 0.0
+        return float(np.mean(np.sqrt(self.emotion_m2 / (self.emotion_turns - 1))))
+
+    def scores(self, vector, emotions=None):
+        # 갱신 전 상태 기준 지표
+        result = {name: 0.0 for name in SESSION_METRICS}
+        result["session_turns"] = self.turns
+        if vector is not None and self.turns:
+            result["session_window_echo"] = float(np.mean([v @ vector for v in self.recent]))
+            centroid = self.centroid()
+            result["session_history_echo"] = _cos(centroid, vector)
+            # 이번 턴이 더해졌을 때 화자 중심이 얼마나 움직이는지 (1 - 코사인)
+            result["session_centroid_drift"] = 1.0 - _cos(centroid, (self.vector_sum + vector) / (self.turns + 1))
+        if emotions and self.emotion_turns:
+            result["session_emotion_shift"] = float(np.linalg.norm(self._emotion_vector(emotions) - self.emotion_mean))
+        result["session_emotion_volatility"] = self.emotion_std()
+        return result
+
+    def update(self, vector, emotions=None):
+        if vector is not None:
+            self.vector_sum = vector.copy() if self.vector_sum is None else self.vector_sum + vector
+            self.recent.append(vector)
+            self.turns += 1
+        if emotions:
+            x = self._emotion_vector(emotions)
+            self.emotion_turns += 1
+            if self.emotion_mean is None:
+                self.emotion_mean = x.copy()
+                self.emotion_m2 = np.zeros_like(x)
+            else:
+                delta = x - self.emotion_mean
+                self.emotion_mean += delta / self.emotion_turns
+                self.emotion_m2 += delta * (x - self.emotion_mean)
+
+# ✅ 세션 상태: 화자별 SpeakerSession 을 들고, 턴마다 메시지 하나만 인코딩 (임베딩 캐시 적중 시 0회)
+class SessionState:
+    def __init__(self, speakers=(), window=5, encode_fn=None, emotion_fn=None):
+        self.window = window
+        self.sessions = {name: SpeakerSession(window) for name in speakers}
+        self._encode_fn = encode_fn or metrics.encode_texts
+        self._emotion_fn = emotion_fn or metrics.emotion_label_scores
+
+    @classmethod
+    def from_responses(cls, full_responses_dict, window=5, encode_fn=None, emotion_fn=None):
+        # 이미 진행된 대화에서 시작할 때: 기존 메시지를 한 번에 인코딩해 상태를 채운다
+        state = cls(list(full_responses_dict), window, encode_fn, emotion_fn)
+        for name, messages in full_responses_dict.items():
+            messages = [m for m in messages if m]
+            if not messages:
+                continue
+            vectors = state._encode_fn(messages)
+            emotions = state._emotion_fn(messages)
+            for vector, emo in zip(vectors, emotions):
+                state.sessions[name].update(_normalize(vector), emo)
+        return state
+
+    def session(self, speaker):
+        if speaker not in self.sessions:
+            self.sessions[speaker] = SpeakerSession(self.window)
+        return self.sessions[speaker]
+
+    def observe(self, speaker, message, vector=None, emotions=None):
+        # 점수를 먼저 계산하고 (이전 턴까지의 상태 기준) 그 다음 이번 턴을 반영
+        # vector / emotions: 채점 워커가 이미 계산한 값이 있으면 넘긴다
+        session = self.session(speaker)
+        if not message:
+            return session.scores(None)
+        vector = _normalize(vector if vector is not None else self._encode_fn([message])[0])
+        if emotions is None:
+            emotions = self._emotion_fn([message])[0]
+        result = session.scores(vector, emotions)
+        session.update(vector, emotions)
+        return result
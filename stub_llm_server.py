@@ -0,0 +1,231 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from fastapi import FastAPI, File, Form, Request, UploadFile
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from rate_limiter import TokenBucket, estimate_tokens
+from replay_cache import ReplayCache
+
+# ✅ 오프라인용 OpenAI 호환 스텁 서버 (POST /v1/chat/completions)
+# 실험 러너 / main.py 를 OPENAI_BASE_URL=http://127.0.0.1:8001/v1 로 돌리면 네트워크 없이 전체 파이프라인을 잴 수 있다
+# 응답: --replay 캐시에 기록된 응답, 없으면 질문을 되받는 합성 응답
+# 지연 (--latency ± --jitter), 한도 초과 429 (--rpm / --tpm 버킷, --rate-limit-rate 무작위 주입), 5xx (--server-error-rate)
+# "stream": true 면 SSE 조각으로 나눠 보낸다 (조각 간격 --token-delay, include_usage 면 마지막에 usage 조각)
+# 배치 API (/v1/files, /v1/batches) 도 흉내 낸다: 업로드한 JSONL 을 백그라운드에서 처리해 결과 / 오류 파일을 만든다
+STUB_CONFIG = {
+    "latency": float(os.getenv("LIRITH_STUB_LATENCY", "0.0")),
+    "jitter": float(os.getenv("LIRITH_STUB_JITTER", "0.0")),
+    "rate_limit_rate": float(os.getenv("LIRITH_STUB_429_RATE", "0.0")),
+    "server_error_rate": float(os.getenv("LIRITH_STUB_5XX_RATE", "0.0")),
+    "rpm": int(os.getenv("LIRITH_STUB_RPM", "0")),
+    "tpm": int(os.getenv("LIRITH_STUB_TPM", "0")),
+    "replay": os.getenv("LIRITH_STUB_REPLAY"),
+    "token_delay": float(os.getenv("LIRITH_STUB_TOKEN_DELAY", "0.02")),
+}
+
+app = FastAPI()
+state = {"requests": None, "tokens": None, "cache": None, "served": 0, "rejected": 0, "files": {}, "batches": {}}
+
+def configure_stub(**config):
+    STUB_CONFIG.update({k: v for k, v in config.items() if v is not None})
+    state["requests"] = TokenBucket(STUB_CONFIG["rpm"]) if STUB_CONFIG["rpm"] else None
+    state["tokens"] = TokenBucket(STUB_CONFIG["tpm"]) if STUB_CONFIG["tpm"] else None
+    state["cache"] = ReplayCache(STUB_CONFIG["replay"], "replay") if STUB_CONFIG["replay"] else None
+
+def synthetic_reply(messages):
+    # 마지막 user 메시지의 "질문:" 줄을 되받는 결정적 응답
+    user = next((m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"), "")
+    question = next((line[3:].strip() for line in user.splitlines() if line.startswith("질문:")), user[:80])
+    return f"나는 스텁 응답이야. 질문은 \"{question}\" 였고, 나는 구조와 감정 사이에서 답을 찾고 있어."
+
+def _ratelimit_headers(estimated):
+    headers = {}
+    for kind, bucket in (("requests", state["requests"]), ("tokens", state["tokens"])):
+        if bucket is None:
+            continue
+        wait = bucket.wait_time(1 if kind == "requests" else estimated)
+        headers[f"x-ratelimit-limit-{kind}"] = str(bucket.capacity)
+        headers[f"x-ratelimit-remaining-{kind}"] = str(max(0, int(bucket.tokens)))
+        headers[f"x-ratelimit-reset-{kind}"] = f"{wait:.3f}s"
+    return headers
+
+def _error(status, message, error_type, code, headers=None):
+    return JSONResponse(status_code=status, headers=headers or {},
+                        content={"error": {"message": message, "type": error_type, "code": code}})
+
+def _over_quota(estimated):
+    # 버킷이 비었으면 기다릴 초, 통과하면 0 (통과하면 소비)
+    waits = []
+    if state["requests"] is not None:
+        waits.append(state["requests"].wait_time(1))
+    if state["tokens"] is not None:
+        waits.append(state["tokens"].wait_time(estimated))
+    wait = max(waits, default=0.0)
+    if wait <= 0:
+        if state["requests"] is not None:
+            state["requests"].consume(1)
+        if state["tokens"] is not None:
+            state["tokens"].consume(estimated)
+    return wait
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    messages = body.get("messages") or []
+    estimated = estimate_tokens(messages, body.get("max_tokens") or 0)
+
+    wait = _over_quota(estimated)
+    if wait <= 0 and random.random() < STUB_CONFIG["rate_limit_rate"]:
+        wait = random.uniform(0.05, 0.5)
+    if wait > 0:
+        state["rejected"] += 1
+        headers = {**_ratelimit_headers(estimated), "retry-after-ms": str(int(wait * 1000))}
+        return _error(429, "Rate limit reached (stub)", "requests", "rate_limit_exceeded", headers)
+    if random.random() < STUB_CONFIG["server_error_rate"]:
+        return _error(500, "The server had an error (stub)", "server_error", None)
+
+    await asyncio.sleep(_latency())
+    if body.get("stream"):
+        return StreamingResponse(_stream_chunks(body), media_type="text/event-stream", headers=_ratelimit_headers(estimated))
+    return JSONResponse(headers=_ratelimit_headers(estimated), content=_completion(body))
+
+def _latency():
+    return max(0.0, STUB_CONFIG["latency"] + random.uniform(-1, 1) * STUB_CONFIG["jitter"])
+
+def _completion(body):
+    messages = body.get("messages") or []
+    hit = state["cache"].lookup(body) if state["cache"] is not None else None
+    content = hit[0].choices[0].message.content if hit is not None else synthetic_reply(messages)
+    prompt_tokens = estimate_tokens(messages)
+    completion_tokens = len(content) // 2
+    state["served"] += 1
+    return {
+        "id": f"chatcmpl-stub-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+        "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                  "total_tokens": prompt_tokens + completion_tokens},
+    }
+
+async def _stream_chunks(body):
+    # 완성된 응답을 몇 글자씩 chat.completion.chunk 로 나눠 보낸다 (첫 조각 전 지연은 _latency, 조각 사이는 token_delay)
+    completion = _completion(body)
+    content = completion["choices"][0]["message"]["content"]
+    base = {"id": completion["id"], "object": "chat.completion.chunk", "created": completion["created"], "model": completion["model"]}
+    frame = lambda chunk: f"data: {json.dumps({**base, **chunk}, ensure_ascii=False)}\n\n"
+    yield frame({"choices": [{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]})
+    for start in range(0, len(content), 4):
+        if start:
+            await asyncio.sleep(STUB_CONFIG["token_delay"])
+        yield frame({"choices": [{"index": 0, "delta": {"content": content[start:start + 4]}, "finish_reason": None}]})
+    yield frame({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+    if (body.get("stream_options") or {}).get("include_usage"):
+        yield frame({"choices": [], "usage": completion["usage"]})
+    yield "data: [DONE]\n\n"
+
+# ✅ 배치 API 흉내: 파일 업로드 → 배치 생성 → 백그라운드 처리 → 상태 조회 / 결과 파일 다운로드
+def _new_file(content, filename, purpose):
+    file_id = f"file-stub-{uuid.uuid4().hex[:12]}"
+    state["files"][file_id] = {"id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+                               "filename": filename, "purpose": purpose, "content": content}
+    return file_id
+
+def _file_object(file_id):
+    return {k: v for k, v in state["files"][file_id].items() if k != "content"}
+
+@app.post("/v1/files")
+async def upload_file(file: UploadFile = File(...), purpose: str = Form(...)):
+    file_id = _new_file(await file.read(), file.filename, purpose)
+    return _file_object(file_id)
+
+@app.get("/v1/files/{file_id}")
+async def get_file(file_id: str):
+    if file_id not in state["files"]:
+        return _error(404, f"No such file: {file_id}", "invalid_request_error", "not_found")
+    return _file_object(file_id)
+
+@app.get("/v1/files/{file_id}/content")
+async def get_file_content(file_id: str):
+    if file_id not in state["files"]:
+        return _error(404, f"No such file: {file_id}", "invalid_request_error", "not_found")
+    return Response(content=state["files"][file_id]["content"], media_type="application/jsonl")
+
+async def _process_batch(batch):
+    batch["status"] = "in_progress"
+    batch["in_progress_at"] = int(time.time())
+    lines = [json.loads(line) for line in state["files"][batch["input_file_id"]]["content"].decode("utf-8").splitlines() if line.strip()]
+    batch["request_counts"]["total"] = len(lines)
+    outputs, errors = [], []
+    for line in lines:
+        await asyncio.sleep(_latency())
+        request_id = f"req-stub-{uuid.uuid4().hex[:12]}"
+        if random.random() < STUB_CONFIG["server_error_rate"]:
+            errors.append({"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": line["custom_id"],
+                           "response": None, "error": {"code": "server_error", "message": "stub batch item failed"}})
+            batch["request_counts"]["failed"] += 1
+            continue
+        outputs.append({"id": f"batch_req_{uuid.uuid4().hex[:12]}", "custom_id": line["custom_id"],
+                        "response": {"status_code": 200, "request_id": request_id, "body": _completion(line["body"])},
+                        "error": None})
+        batch["request_counts"]["completed"] += 1
+    encode = lambda records: "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records).encode("utf-8")
+    batch["output_file_id"] = _new_file(encode(outputs), "batch_output.jsonl", "batch_output") if outputs else None
+    batch["error_file_id"] = _new_file(encode(errors), "batch_errors.jsonl", "batch_output") if errors else None
+    batch["status"] = "completed"
+    batch["completed_at"] = int(time.time())
+
+@app.post("/v1/batches")
+async def create_batch(request: Request):
+    body = await request.json()
+    if body.get("input_file_id") not in state["files"]:
+        return _error(400, "input_file_id not found", "invalid_request_error", "invalid_file")
+    batch_id = f"batch_stub_{uuid.uuid4().hex[:12]}"
+    batch = {
+        "id": batch_id, "object": "batch", "endpoint": body.get("endpoint"), "errors": None,
+        "input_file_id": body["input_file_id"], "completion_window": body.get("completion_window", "24h"),
+        "status": "validating", "output_file_id": None, "error_file_id": None, "created_at": int(time.time()),
+        "request_counts": {"total": 0, "completed": 0, "failed": 0}, "metadata": body.get("metadata"),
+    }
+    state["batches"][batch_id] = batch
+    asyncio.get_running_loop().create_task(_process_batch(batch))
+    return batch
+
+@app.get("/v1/batches/{batch_id}")
+async def get_batch(batch_id: str):
+    if batch_id not in state["batches"]:
+        return _error(404, f"No such batch: {batch_id}", "invalid_request_error", "not_found")
+    return state["batches"][batch_id]
+
+@app.get("/v1/stub/stats")
+async def stub_stats():
+    cache = state["cache"]
+    return {"served": state["served"], "rejected": state["rejected"], "batches": len(state["batches"]), "config": STUB_CONFIG,
+            "cache": cache.stats() if cache is not None else None}
+
+configure_stub()
+
+if __name__ == "__main__":
+    import uvicorn
+    parser = argparse.ArgumentParser(description="OpenAI 호환 스텁 LLM 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", type=float, help="응답 지연 (초)")
+    parser.add_argument("--jitter", type=float, help="지연 흔들림 (± 초)")
+    parser.add_argument("--rate-limit-rate", type=float, help="무작위 429 비율 (0~1)")
+    parser.add_argument("--server-error-rate", type=float, help="무작위 500 비율 (0~1)")
+    parser.add_argument("--rpm", type=int, help="분당 요청 한도 (넘으면 429)")
+    parser.add_argument("--tpm", type=int, help="분당 토큰 한도 (넘으면 429)")
+    parser.add_argument("--replay", help="응답을 꺼낼 재생 캐시 (LIRITH_REPLAY_PATH 파일)")
+    parser.add_argument("--token-delay", type=float, help="스트리밍 조각 사이 지연 (초)")
+    args = parser.parse_args()
+    configure_stub(latency=args.latency, jitter=args.jitter, rate_limit_rate=args.rate_limit_rate,
+                   server_error_rate=args.server_error_rate, rpm=args.rpm, tpm=args.tpm, replay=args.replay,
+                   token_delay=args.token_delay)
+    print(f"🧪 스텁 LLM 서버: http://{args.host}:{args.port}/v1 ({STUB_CONFIG})")
+    uvicorn.run(app, host=args.host, port=args.port)